@@ -1,16 +1,36 @@
-from .metadata import fullMetadata, metadata
+from .metadata import fullMetadata, loadMetadata
 from . import paths
+from . import cache
+from . import catalog
+from . import timeabove
+from . import events
+from . import eventrates
+from . import cube
 # from info import __doc__
 
 from .accessor import Accessor
-from .accessors import accessorExports
+from .accessors import accessorExports, accessorStreams, accessorSourcePatterns, transcodeNvspl, nvsplHistograms
+from .compute import computeExports
+from .events import eventExports
 
-accessors = { name: Accessor(parserFunc, pathToData) for name, (parserFunc, pathToData) in accessorExports.items() }
+accessors = { name: Accessor(parserFunc, pathToData, name= name, streamFunc= accessorStreams.get(name), sourcePattern= accessorSourcePatterns.get(name, "*")) for name, (parserFunc, pathToData) in dict(accessorExports, **computeExports, **eventExports).items() }
 
 globals().update( accessors )
 
-__all__ = list(accessors.keys()) + ["fullMetadata", "metadata", "paths", "Accessor"]
+__all__ = list(accessors.keys()) + ["fullMetadata", "loadMetadata", "metadata", "paths", "cache", "catalog", "timeabove", "events", "eventrates", "cube", "Accessor", "transcodeNvspl", "nvsplHistograms"]
 
 # clean up exported namespace
 del accessors
 del accessorExports
+del computeExports
+del eventExports
+del accessorStreams
+del accessorSourcePatterns
+# importing .metadata bound the submodule here; remove it so `soundDENA.metadata` goes through __getattr__
+del metadata
+
+def __getattr__(name):
+    # `soundDENA.metadata` is loaded on first access, instead of reading the Excel workbooks on import
+    if name == "metadata":
+        return loadMetadata()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
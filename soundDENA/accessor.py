@@ -1,13 +1,18 @@
 from . import paths
+from . import cache
+from . import catalog
 
 import pandas as pd
 import pathlib
 import glob
 import traceback
 import sys
+import collections
+import concurrent.futures
+import functools
 
 class Accessor:
-    def __init__(self, parserFunc, pathToData):
+    def __init__(self, parserFunc, pathToData, name= None, streamFunc= None, sourcePattern= "*"):
         """
         Instantiate an Accessor for a specific filetype by giving a function
         to parse that kind of file, and where that file is located.
@@ -20,6 +25,15 @@ class Accessor:
             :meth:`parse` method of the instance.
         pathToData : str, pathlib.Path, or function
             Where to find the filetype in a site's :ref:`data directory <dataDir>`
+        name : str, optional
+            Name of the filetype, used to identify its results in caches.
+            Defaults to the name of ``parserFunc``.
+        streamFunc : function, optional
+            A generator function which, given the same arguments as ``parserFunc``, yields
+            the data in pieces rather than all at once. Used by :meth:`stream`.
+        sourcePattern : str, optional
+            If ``pathToData`` gives a directory, the shell-style wildcard pattern of the files in it
+            that ``parserFunc`` reads. Those files are what's checked for changes when caching.
 
 
         The docstring of ``parserFunc`` also will become the docstring of the Accessor instance.
@@ -61,9 +75,12 @@ class Accessor:
             self._filepath = pathToData
         else:
             self.pathToData = pathToData
+        self.name = name if name is not None else parserFunc.__name__
+        self.streamFunc = streamFunc
+        self.sourcePattern = sourcePattern
         self.__doc__ = self.parse.__doc__
 
-    def __call__(self, sites, quiet= True, **kwargs):
+    def __call__(self, sites, quiet= True, siteWorkers= None, siteProcesses= False, prefetch= 0, **kwargs):
         """
         Iterate site-by-site over a type of data.
 
@@ -76,6 +93,17 @@ class Accessor:
             :ref:`siteID` strings, or a pandas structure indexed by :ref:`siteID`
         quiet : boolean, optional
             Whether to not print info about any errors that occur
+        siteWorkers : int, optional
+            Number of sites to read concurrently, at least 1. None or 1 reads one site at a time.
+            Sites are still yielded in order, and at most ``siteWorkers`` sites are
+            read ahead of the one being yielded, so memory use stays bounded.
+        siteProcesses : boolean, optional
+            If True, read sites in a pool of ``siteWorkers`` processes instead of threads.
+            The parsed data must then be picklable.
+        prefetch : int, optional
+            Number of upcoming sites to read in the background while the current one is
+            being used by the caller, so reading the next sites overlaps with whatever
+            work is done in the body of the loop. 0 disables read-ahead.
         kwargs
             Any keyword arguments specific to this filetype's :meth:`parse` or ``pathToData`` function
 
@@ -87,10 +115,21 @@ class Accessor:
         site : str
         year : str
         """
+        # Checked here, rather than in the generator, so bad arguments raise immediately
+        # instead of on the first iteration
+        workers = siteWorkers if siteWorkers is not None else 1
+        if workers < 1:
+            raise ValueError("siteWorkers must be at least 1, not {}".format(siteWorkers))
+        if prefetch < 0:
+            raise ValueError("prefetch must be 0 or more, not {}".format(prefetch))
+        return self._iterate(sites, quiet, workers, max(workers, prefetch + 1), siteProcesses, kwargs)
+
+    def _iterate(self, sites, quiet, workers, inFlight, siteProcesses, kwargs):
         ## TODO: progress bar?
-        for dataDir, unit, site, year in paths.dataDirs(sites, quiet= quiet):
+        dataDirs = paths.dataDirs(sites, quiet= quiet)
+        for (dataDir, unit, site, year), getData in self._pending(dataDirs, workers, inFlight, siteProcesses, kwargs):
             try:
-                data = self.access((dataDir, unit, site, year), **kwargs)
+                data = getData()
                 yield data, unit, site, year
             except KeyboardInterrupt:
                 print("*** KeyboardInterrupt: halting execution ***")
@@ -104,7 +143,7 @@ class Accessor:
                 if not quiet: print( traceback.format_exc() )
                 continue
 
-    def all(self, sites, quiet= True, **kwargs):
+    def all(self, sites, quiet= True, siteWorkers= None, siteProcesses= False, **kwargs):
         """
         Read data from all specified sites into a single DataFrame or dict.
 
@@ -114,6 +153,10 @@ class Accessor:
             :ref:`siteID` strings, or a pandas structure indexed by :ref:`siteID`
         quiet : boolean, optional
             Whether to not print info about any errors that occur
+        siteWorkers : int, optional
+            Number of sites to read concurrently (see :meth:`__call__`)
+        siteProcesses : boolean, optional
+            Whether to read sites in worker processes instead of threads (see :meth:`__call__`)
         kwargs
             Any keyword arguments specific to this filetype's :meth:`parse` or ``pathToData`` function
 
@@ -125,7 +168,7 @@ class Accessor:
             Otherwise, returns a dict of ``{ siteID: data }``
         """
 
-        results = { paths.siteID(unit, site, year): data for data, unit, site, year in self.__call__(sites, quiet= quiet, **kwargs) }
+        results = { paths.siteID(unit, site, year): data for data, unit, site, year in self.__call__(sites, quiet= quiet, siteWorkers= siteWorkers, siteProcesses= siteProcesses, **kwargs) }
         try:
             joined = pd.concat(results)
             try:
@@ -138,6 +181,38 @@ class Accessor:
         except TypeError:
             return results
 
+    def _pending(self, dataDirs, workers, inFlightLimit, processes, kwargs):
+        """
+        Yield ``(dataDir, unit, site, year), getData`` for each site in ``dataDirs``, in order.
+
+        Calling ``getData()`` returns the site's parsed data, or raises whatever error
+        reading it raised, so the caller can handle errors per-site.
+
+        If ``inFlightLimit`` is more than 1, sites are submitted to an executor of ``workers``
+        threads or processes ahead of time, keeping at most ``inFlightLimit`` sites in flight.
+        """
+        if inFlightLimit <= 1:
+            for dataDirSpec in dataDirs:
+                yield dataDirSpec, functools.partial(self.access, dataDirSpec, **kwargs)
+            return
+
+        Executor = concurrent.futures.ProcessPoolExecutor if processes else concurrent.futures.ThreadPoolExecutor
+        inFlight = collections.deque()
+        with Executor(max_workers= workers) as executor:
+            try:
+                for dataDirSpec in dataDirs:
+                    inFlight.append( (dataDirSpec, executor.submit(self.access, dataDirSpec, **kwargs)) )
+                    if len(inFlight) >= inFlightLimit:
+                        dataDirSpec, future = inFlight.popleft()
+                        yield dataDirSpec, future.result
+                while len(inFlight) > 0:
+                    dataDirSpec, future = inFlight.popleft()
+                    yield dataDirSpec, future.result
+            finally:
+                # If iteration stops early, don't wait on sites nobody will look at
+                for dataDirSpec, future in inFlight:
+                    future.cancel()
+
     def paths(self, sites, quiet= True, **kwargs):
         """
         Iterate site-by-site over the paths to this sort of data file.
@@ -182,7 +257,80 @@ class Accessor:
         Returns
         -------
         varies
-            The result of the instance's :meth:`parse` function (typically a pandas DataFrame or Panel)
+            The result of the instance's :meth:`parse` function (typically a pandas DataFrame or soundDENA.cube.LabeledArray)
+
+        If the memory or disk cache is enabled (see :func:`soundDENA.cache.enableMemoryCache` and
+        :func:`soundDENA.cache.enableDiskCache`), a cached result is returned instead of parsing the
+        files again, as long as the files haven't been modified since.
+        """
+        dataDir, unit, site, year = self._resolveSite(site)
+        filePath = self._filepath(dataDir, unit, site, year, **kwargs)
+
+        if cache.diskCache is None and cache.memoryCache is None:
+            return self.parse(filePath, **kwargs)
+        return self._cachedParse(filePath, kwargs)
+
+    def _cachedParse(self, filePath, kwargs):
+        """
+        Parse the file(s) at filePath, or return the cached result of parsing them.
+        """
+        filePaths = cache.sourceFiles(filePath, self.sourcePattern)
+        if filePaths is None:
+            return self.parse(filePath, **kwargs)
+        if not isinstance(filePath, (str, pathlib.Path)):
+            # filePath may be a one-shot iterator (i.e. from glob), which sourceFiles consumed
+            filePath = filePaths
+
+        entryIdentity = cache.identity(self.name, filePaths, kwargs)
+        entryStamp = cache.stamp(filePaths)
+
+        # Keep references to the caches, in case they're disabled by another thread midway through
+        memoryCache, diskCache = cache.memoryCache, cache.diskCache
+
+        if memoryCache is not None:
+            data = memoryCache.get(entryIdentity, entryStamp)
+            if data is not None:
+                return data
+
+        data = diskCache.get(entryIdentity, entryStamp) if diskCache is not None else None
+        if data is None:
+            data = self.parse(filePath, **kwargs)
+            if diskCache is not None:
+                diskCache.put(entryIdentity, entryStamp, data)
+
+        if memoryCache is not None:
+            memoryCache.put(entryIdentity, entryStamp, data)
+        return data
+
+    def stream(self, site, **kwargs):
+        """
+        Iterate over data from one site in pieces, rather than reading it all at once.
+
+        Only some filetypes support streaming (those given a ``streamFunc`` in :meth:`__init__`),
+        i.e. ``soundDENA.nvspl.stream("DENAFANG2013", chunk= "1d")``; others raise TypeError.
+
+        Parameters
+        ----------
+        site
+            A single site or data directory specifier, as for :meth:`access`
+        kwargs
+            Any keyword arguments specific to this filetype's ``streamFunc`` or ``pathToData`` function
+
+        Returns
+        -------
+        iterator
+            The result of the instance's ``streamFunc``
+        """
+        if self.streamFunc is None:
+            raise TypeError("{} data can't be streamed".format(self.name))
+        dataDir, unit, site, year = self._resolveSite(site)
+        filePath = self._filepath(dataDir, unit, site, year, **kwargs)
+        return self.streamFunc(filePath, **kwargs)
+
+    @staticmethod
+    def _resolveSite(site):
+        """
+        Turn any site specifier accepted by :meth:`access` into a tuple of (dataDir, unit, site, year).
         """
         if isinstance(site, tuple) or isinstance(site, list):
             if len(site) == 4:
@@ -201,8 +349,7 @@ class Accessor:
         else:
             raise ValueError("Unknown site specification {}".format(site))
 
-        filePath = self._filepath(dataDir, unit, site, year, **kwargs)
-        return self.parse(filePath, **kwargs)
+        return dataDir, unit, site, year
 
     @staticmethod
     def parse(filepath, **kwargs):
@@ -240,16 +387,23 @@ class Accessor:
         and joined onto the root data directory for the site.
         If the path contains a ``*`` character, it will be passed to ``glob``,
         and the resulting list will be converted to pathlib.Paths and returned.
+
+        Files are found using :mod:`soundDENA.catalog`, so directories that haven't changed
+        since they were last listed aren't listed again.
         """
         specificPathToData = str(self.pathToData).format(unit= unit, site= site, year= year)
         pathForReader = dataDir / pathlib.Path(specificPathToData)
 
         strPath = str(pathForReader)
         if "*" in strPath:
-            pathsForReader = map(pathlib.Path, glob.iglob(strPath))
+            if "*" in str(pathForReader.parent):
+                pathsForReader = map(pathlib.Path, glob.iglob(strPath))
+            else:
+                # Look up files in the catalog, rather than listing the directory every time
+                pathsForReader = catalog.glob(pathForReader.parent, pathForReader.name)
             return pathsForReader
 
-        if not pathForReader.exists():
+        if not catalog.exists(pathForReader):
             raise IOError("{} does not exist.".format(pathForReader))
 
         return pathForReader
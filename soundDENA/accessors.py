@@ -1,5 +1,12 @@
 from . import paths
 from . import accessor
+from . import catalog
+from . import cache
+from . import grid
+from . import archive
+from . import pyramid
+from . import sketch
+from . import cube
 
 import numpy as np
 import pandas as pd
@@ -10,8 +17,125 @@ import warnings
 import os
 import time
 import itertools
+import concurrent.futures
+import functools
+
+## NVSPL schema
+# One-third octave bands, as they're named in the returned DataFrame
+nvsplBands = [
+    '12.5', '15.8', '20', '25', '31.5', '40', '50', '63', '80', '100',
+    '125', '160', '200', '250', '315', '400', '500', '630', '800', '1000',
+    '1250', '1600', '2000', '2500', '3150', '4000', '5000', '6300', '8000',
+    '10000', '12500', '16000', '20000'
+]
+nvsplLevels = nvsplBands + ['dbA', 'dbC', 'dbF']
+nvsplWeather = ['Voltage', 'WindSpeed', 'WindDir', 'TempIns', 'TempOut', 'Humidity']
+
+# { name in file: name in DataFrame }, i.e. { "H12p5": "12.5" }
+nvsplColumnNames = { "H" + band.replace('.', 'p'): band for band in nvsplBands }
+# Explicit dtypes for every known numeric column (by name in file), so the parser doesn't have to infer them
+nvsplDtypes = { column: np.float64 for column in list(nvsplColumnNames) + ['dbA', 'dbC', 'dbF'] + nvsplWeather }
+nvsplDtypes["SiteID"] = str
+# Levels that are too quiet to measure are written as "-Infinity"; these are read as NaN
+nvsplNaValues = ["-Infinity"]
+nvsplTimeFormat = "%Y-%m-%d %H:%M:%S"
+
+## Fixed-point storage of levels
+# { storage mode: number of stored units per dB }
+fixedPointScales = { "centi": 100, "deci": 10 }
+# Value stored in place of NaN (missing or "-Infinity") levels
+fixedPointNaN = np.iinfo(np.int16).min
+
+def toFixedPoint(data, storage= "centi"):
+    """
+    Convert the level columns (bands, dBA, dBC, dBF) of NVSPL data to int16 fixed-point.
+
+    Parameters
+    ----------
+    data : DataFrame
+        NVSPL data, as returned by :func:`nvspl`
+    storage : {"centi", "deci"}
+        Store levels in hundredths ("centi") or tenths ("deci") of a dB. NVSPL files are written
+        with 0.1 dB precision, so neither loses information; "centi" covers levels up to 327 dB.
+
+    Returns
+    -------
+    DataFrame
+        A copy of data, with levels as int16. NaN levels (and any out of range) are stored as
+        :data:`fixedPointNaN`. Other columns are unchanged.
+    """
+    scale = fixedPointScales[storage]
+    info = np.iinfo(np.int16)
+    data = data.copy()
+    for column in data.columns.intersection(nvsplLevels):
+        scaled = np.round(data[column].values * scale)
+        invalid = ~np.isfinite(scaled) | (scaled <= info.min) | (scaled > info.max)
+        scaled[invalid] = fixedPointNaN
+        data[column] = scaled.astype(np.int16)
+    return data
 
-def nvspl(filepaths, interval= 1, onlyColumns= None, quiet= True, **kwargs):
+def fromFixedPoint(data, storage= "centi", columns= None):
+    """
+    Convert fixed-point levels from :func:`toFixedPoint` back to float64 dB.
+
+    Converting is cheap, so it's best done just for the columns and rows you need,
+    right when you need them, i.e. ``fromFixedPoint(data.loc["2013-07-04"], columns= ["dbA"])``.
+
+    Parameters
+    ----------
+    data : DataFrame
+        NVSPL data with fixed-point levels
+    storage : {"centi", "deci"}
+        The storage mode the levels were converted with
+    columns : list of str, optional
+        Only convert and return these columns. By default, converts every level column
+        and returns them along with the rest of the columns.
+
+    Returns
+    -------
+    DataFrame
+    """
+    scale = fixedPointScales[storage]
+    if columns is not None:
+        data = data[columns]
+    data = data.copy()
+    for column in data.columns.intersection(nvsplLevels):
+        values = data[column].values
+        if values.dtype != np.int16:
+            continue
+        converted = values / scale
+        converted[values == fixedPointNaN] = np.nan
+        data[column] = converted
+    return data
+
+def _readNvsplFile(filepath, index_index, onlyColumns, storage= None):
+    """
+    Read a single NVSPL file into a DataFrame indexed by STime.
+
+    This is kept at module level (rather than inside :func:`nvspl`) so it can be
+    pickled and sent to worker processes when reading in parallel.
+    """
+    df = pd.read_csv(str(filepath),
+                     engine= 'c',
+                     # sep= ',',
+                     index_col= index_index,
+                     usecols= onlyColumns,
+                     dtype= nvsplDtypes,
+                     na_values= nvsplNaValues
+                     )
+    try:
+        df.index = pd.to_datetime(df.index, format= nvsplTimeFormat)
+    except ValueError:
+        # Unusual timestamp format; fall back to letting pandas figure it out
+        df.index = pd.to_datetime(df.index)
+
+    if storage is not None:
+        # Convert file-by-file, so the full float64 dataset never exists at once
+        df.rename(columns= nvsplColumnNames, inplace= True)
+        df = toFixedPoint(df, storage)
+    return df
+
+def nvspl(filepaths, interval= 1, onlyColumns= None, quiet= True, workers= None, processes= False, start= None, end= None, hours= None, dates= None, storage= None, asGrid= False, resolution= None, processed= True, partialDays= False, useArchive= True, usePyramid= True, **kwargs):
     # **kwargs used to handle being given keyword args for nvsplPaths() as well
     """
     Read all the NVSPL files in a directory into a single pandas DataFrame, indexed by date.
@@ -21,7 +145,7 @@ def nvspl(filepaths, interval= 1, onlyColumns= None, quiet= True, **kwargs):
 
     Parameters
     ----------
-    filepaths : list of str or pathlib.Path
+    filepaths : list of pathlib.Path, soundDENA.archive.ColumnArchive, or soundDENA.pyramid.Pyramid
         List of paths to NVSPL files, all of which will be read into one DataFrame.
         Assumed to be sorted.
 
@@ -37,15 +161,218 @@ def nvspl(filepaths, interval= 1, onlyColumns= None, quiet= True, **kwargs):
         are necessary for indexing by date.
     quiet : boolean, default True
         Whether to not print progress reading files
+    workers : int, default None
+        Number of files to parse concurrently. None or 1 reads the files one at a time.
+        The result is identical either way: files are concatenated in the order given.
+    processes : boolean, default False
+        If True, parse files in a pool of ``workers`` processes instead of threads.
+        Processes sidestep the GIL entirely, but each parsed file must be pickled back
+        to the main process, so threads are usually faster unless there are many cores.
+    start, end : datetime-like, default None
+        Only include data from this time range (inclusive)
+    hours : iterable of int, default None
+        Only include data from these hours of the day, i.e. ``range(7, 19)``
+    dates : iterable of date-like, default None
+        Only include data from these days
+    storage : {None, "centi", "deci"}, default None
+        If given, store levels (bands, dBA, dBC, dBF) as int16 hundredths or tenths of a dB,
+        using a quarter of the memory of float64. Missing levels are stored as :data:`fixedPointNaN`.
+        Use :func:`fromFixedPoint` to convert the columns you need back to dB.
+    asGrid : boolean, default False
+        Return a :class:`soundDENA.grid.RegularGrid` instead of a DataFrame: contiguous 1-second
+        segments with no per-row timestamps, where looking up a time is simple arithmetic.
+        Use its ``toFrame()`` method to get back a DataFrame.
+    resolution : str or Timedelta, default None
+        Average the data into bins of this length, i.e. ``"1min"`` or ``"1h"``, instead of returning
+        every second. Levels are averaged in the energy domain, weather columns arithmetically,
+        and other columns are dropped. Each row is indexed by the start of its bin, and **start**
+        and **end** select bins by their start times. See :func:`nvsplPyramid`.
+    processed, partialDays : boolean, default True, False
+        Which of the site's NVSPL files **filepaths** were chosen from, as in :func:`nvsplPaths`
+    useArchive : boolean, default True
+        Whether to read the site's archive (see :func:`transcodeNvspl`) instead of the text files,
+        when it's up to date
+    usePyramid : boolean, default True
+        Whether to read (and build, if necessary) the site's resolution pyramid (see :func:`nvsplPyramid`),
+        when one of its levels coarser than the original samples evenly divides **resolution**
+
+    When given to ``soundDENA.nvspl``, **start**, **end**, **hours**, and **dates** are also used
+    by :func:`nvsplPaths` to skip reading files outside the selection entirely (using the date and
+    hour in their names), so a narrow selection is much faster to read than a whole site.
+
+    If **filepaths** are just the files :func:`nvsplPaths` selects from a site, and the site has an
+    up-to-date archive made by :func:`transcodeNvspl`, the data is read from the archive (touching only
+    the days and columns selected) rather than from the text files. The result is the same either way.
+    Likewise, given a **resolution** that's a multiple of 10 seconds, the data is read from the site's
+    resolution pyramid, which is built (and cached) the first time it's needed. Other resolutions
+    (i.e. "1.5s") are averaged from the original samples.
 
     Returns
     -------
     DataFrame
-        Indexed by date, with frequency column names as decimals instead of "12p5h"
+        Indexed by date, with frequency column names as decimals instead of "12p5h".
+        All level and weather columns are float64, with "-Infinity" levels as NaN
+        (unless levels are stored as fixed-point; see **storage**).
     """
 
-    dataframes = []
+    start_t = time.time()
+    if resolution is not None and usePyramid and interval == 1 and _pyramidFits(resolution) and not isinstance(filepaths, (archive.ColumnArchive, pyramid.Pyramid)):
+        filepaths = list(filepaths)
+        # With a resolution, files are selected through the end of the last bin
+        selectionSite = _nvsplSelectionSite(filepaths, processed, partialDays, start, _nvsplBinsEnd(end, resolution), hours, dates)
+        if selectionSite is not None:
+            dataDir, unit, siteCode, year, _ = selectionSite
+            filepaths = nvsplPyramid(dataDir, unit, siteCode, year, processed, partialDays, useArchive, quiet)
+
+    if useArchive and interval == 1 and not isinstance(filepaths, (archive.ColumnArchive, pyramid.Pyramid)):
+        filepaths = list(filepaths)
+        selectionEnd = _nvsplBinsEnd(end, resolution) if resolution is not None else end
+        nvsplArchive = _freshNvsplArchive(filepaths, processed, partialDays, start, selectionEnd, hours, dates)
+        if nvsplArchive is not None:
+            filepaths = nvsplArchive
+
+    if isinstance(filepaths, pyramid.Pyramid):
+        site = _readNvsplPyramid(filepaths, resolution, onlyColumns, start, end, hours, dates)
+        nRead = len(filepaths.manifest["info"]["sources"])
+    elif resolution is not None:
+        # Average whole bins, so read past the end of the selection to the end of the last bin
+        binsEnd = _nvsplBinsEnd(end, resolution)
+        if isinstance(filepaths, archive.ColumnArchive):
+            samples = _readNvsplArchive(filepaths, onlyColumns, start, binsEnd, dates)
+            nRead = len(filepaths.manifest["info"]["sources"])
+        else:
+            samples, nRead = _readNvsplFiles(filepaths, interval, onlyColumns, quiet, workers, processes, None)
+        samples = _trimNvspl(samples, start, binsEnd, hours, dates)
+        site = _nvsplMeans(*pyramid.fromSamples(_nvsplAveragedColumns(samples)), resolution, start, end)
+    elif isinstance(filepaths, archive.ColumnArchive):
+        site = _readNvsplArchive(filepaths, onlyColumns, start, end, dates)
+        nRead = len(filepaths.manifest["info"]["sources"])
+    else:
+        site, nRead = _readNvsplFiles(filepaths, interval, onlyColumns, quiet, workers, processes, storage)
+
+    if resolution is None:
+        # Trim any rows outside the selection that were in files that couldn't be excluded by name
+        site = _trimNvspl(site, start, end, hours, dates)
+
+    if storage is not None and (resolution is not None or isinstance(filepaths, archive.ColumnArchive)):
+        site = toFixedPoint(site, storage)
+
+    if not quiet: print( "Imported {} files in {:.1f} sec".format(nRead, time.time() - start_t) )
+    if asGrid:
+        return grid.RegularGrid.fromFrame(site, step= resolution if resolution is not None else "1s")
+    return site
+
+def nvsplStream(filepaths, chunk= "1h", interval= 1, onlyColumns= None, start= None, end= None, hours= None, dates= None, storage= None, processed= True, partialDays= False, useArchive= True, **kwargs):
+    """
+    Iterate over NVSPL data in chunks of time (or rows), in chronological order,
+    without ever holding more than about one chunk in memory.
+
+    Use this through the Accessor, as ``soundDENA.nvspl.stream(site, chunk= "1d")``, to fold over
+    a whole deployment (i.e. computing hourly Leqs or level histograms) that wouldn't fit in memory at once.
+
+    Parameters
+    ----------
+    filepaths : list of pathlib.Path, or soundDENA.archive.ColumnArchive
+        As returned by :func:`nvsplPaths`
 
+    Keyword Args
+    ------------
+    chunk : str, pandas offset, or int, default "1h"
+        How to divide the data. A frequency string like ``"1h"``, ``"1d"``, or ``"10min"`` yields one
+        DataFrame per period of that length (aligned to the start of the period; periods with no data
+        are skipped). A positive int yields DataFrames of that many rows (the last may be shorter).
+    interval : int, default 1
+        Only every i files will be read, as for :func:`nvspl`. Archives are only used when this is 1.
+    onlyColumns, start, end, hours, dates, storage, processed, partialDays, useArchive
+        Same as for :func:`nvspl`
+
+    Yields
+    ------
+    DataFrame
+        Parsed the same way as :func:`nvspl`, including column names and dtypes
+    """
+    # Checked here rather than in _rechunk, so a bad chunk fails on the call instead of on the first chunk
+    if isinstance(chunk, int) and chunk < 1:
+        raise ValueError("chunk must be at least 1 row, not {}".format(chunk))
+    if interval < 1:
+        raise ValueError("interval must be at least 1, not {}".format(interval))
+    if interval != 1 and isinstance(filepaths, archive.ColumnArchive):
+        raise ValueError("interval selects files, so it can't be used when streaming an archive")
+
+    if useArchive and interval == 1 and not isinstance(filepaths, archive.ColumnArchive):
+        filepaths = list(filepaths)
+        nvsplArchive = _freshNvsplArchive(filepaths, processed, partialDays, start, end, hours, dates)
+        if nvsplArchive is not None:
+            filepaths = nvsplArchive
+
+    if isinstance(filepaths, archive.ColumnArchive):
+        columns = _nvsplArchiveColumns(filepaths.manifest["info"]["fileColumns"], filepaths.manifest["columns"], onlyColumns)
+        archiveStart, archiveEnd = _nvsplArchiveRange(start, end, dates)
+        pieces = filepaths.iterChunks(columns, archiveStart, archiveEnd)
+    else:
+        usecols, index_index = _nvsplUsecols(onlyColumns)
+        pieces = ( _readNvsplFile(filepath, index_index, usecols, None) for filepath in list(filepaths)[::interval] )
+
+    def parsedPieces():
+        for piece in pieces:
+            piece.index.name = "date"
+            piece = _trimNvspl(piece.rename(columns= nvsplColumnNames), start, end, hours, dates)
+            if len(piece) > 0:
+                yield toFixedPoint(piece, storage) if storage is not None else piece
+
+    return _rechunk(parsedPieces(), chunk)
+
+def _rechunk(pieces, chunk):
+    """
+    Regroup an iterator of chronologically-ordered DataFrames into chunks by time period or number of rows.
+    """
+    buffered = []
+    nBuffered = 0
+
+    if isinstance(chunk, int):
+        for piece in pieces:
+            while len(piece) > 0:
+                take = chunk - nBuffered
+                buffered.append(piece.iloc[:take])
+                nBuffered += len(buffered[-1])
+                piece = piece.iloc[take:]
+                if nBuffered == chunk:
+                    yield pd.concat(buffered)
+                    buffered, nBuffered = [], 0
+    else:
+        bufferedPeriod = None
+        for piece in pieces:
+            periods = piece.index.floor(chunk)
+            # Positions where the period changes within this piece
+            breaks = np.flatnonzero(periods[1:] != periods[:-1]) + 1
+            bounds = np.concatenate([[0], breaks, [len(piece)]])
+            for lo, hi in zip(bounds[:-1], bounds[1:]):
+                period = periods[lo]
+                if bufferedPeriod is not None and period != bufferedPeriod:
+                    yield pd.concat(buffered)
+                    buffered = []
+                buffered.append(piece.iloc[lo:hi])
+                bufferedPeriod = period
+
+    if len(buffered) > 0:
+        yield pd.concat(buffered)
+
+def _trimNvspl(site, start, end, hours, dates):
+    """
+    Select just the rows of NVSPL data within a time range, hours of the day, and dates.
+    """
+    if start is not None or end is not None:
+        site = site.loc[start:end]
+    if hours is not None:
+        site = site[ site.index.hour.isin(list(hours)) ]
+    if dates is not None:
+        site = site[ site.index.normalize().isin(pd.to_datetime(list(dates))) ]
+    return site
+
+def _nvsplUsecols(onlyColumns):
+    """
+    Return the columns to read from each NVSPL file, and the position of the index column among them.
+    """
     index_index = 1 # Default position of the index column (STime)
     if onlyColumns is not None:
         # Ensure we read the STime (date) column, otherwise indexing will be messed up
@@ -55,61 +382,171 @@ def nvspl(filepaths, interval= 1, onlyColumns= None, quiet= True, **kwargs):
             if "STime" not in onlyColumns:
                 onlyColumns = ["STime"] + onlyColumns
             index_index = 0
-        elif types == [str]*len(onlyColumns):
+        elif types == [int]*len(onlyColumns):
             if 1 not in onlyColumns:
                 onlyColumns = [1] + onlyColumns
                 onlyColumns.sort()
             index_index = onlyColumns.index(1)
         else:
             raise ValueError("onlyColumns must be a list of strings or of integers")
+    return onlyColumns, index_index
 
-    start_t = time.time()
-    for i, filepath in enumerate(filepaths):
-            if i % interval == 0:
-                df = pd.read_csv(str(filepath),
-                                 engine= 'c',
-                                 # sep= ',',
-                                 parse_dates= True,
-                                 index_col= index_index,
-                                 infer_datetime_format= True,
-                                 usecols= onlyColumns
-                                 )
+def _readNvsplFiles(filepaths, interval, onlyColumns, quiet, workers, processes, storage):
+    """
+    Read and concatenate NVSPL text files. Returns the DataFrame, and the number of files read.
+    """
+    dataframes = []
+    onlyColumns, index_index = _nvsplUsecols(onlyColumns)
+
+    filepaths = list(filepaths)
+    selected = filepaths[::interval]
+
+    if workers is None or workers <= 1:
+        for i, filepath in enumerate(selected):
+            dataframes.append( _readNvsplFile(filepath, index_index, onlyColumns, storage) )
+            if not quiet: print("Read NVSPL {} of {}".format(i+1, len(selected)))
+    else:
+        Executor = concurrent.futures.ProcessPoolExecutor if processes else concurrent.futures.ThreadPoolExecutor
+        with Executor(max_workers= workers) as executor:
+            # Executor.map yields results in the order of its inputs, not of completion,
+            # so the concatenated DataFrame is the same as when reading sequentially
+            results = executor.map(_readNvsplFile, selected, itertools.repeat(index_index), itertools.repeat(onlyColumns), itertools.repeat(storage))
+            for i, df in enumerate(results):
                 dataframes.append(df)
+                if not quiet: print("Read NVSPL {} of {}".format(i+1, len(selected)))
 
-                if not quiet: print("Read NVSPL {} of {}".format(i+1, len(filepaths)))
-
+    # Files are sorted by name, so they're in chronological order, and concatenating them
+    # gives a monotonic index without needing to sort
     site = pd.concat(dataframes)
-    # site.sort_index(inplace= True)
 
     # Make column names slightly nicer
     site.index.name = "date"
-    columns = { column: column.replace('H', '').replace('p', '.') for column in site.columns if re.match(r"H\d+p?\d*", column) is not None }
-    site.rename(columns= columns, inplace= True)
+    site.rename(columns= nvsplColumnNames, inplace= True)
 
     # TODO: rename dbA, dbT to dBA, dBT for consistencty
     # TODO: potentially drop siteID column
 
-    # Coerce numeric columns to floats, in case of "-Infinity" values
-    try:
-        numericCols = [
-            '12.5', '15.8', '20', '25', '31.5', '40', '50', '63', '80', '100',
-            '125', '160', '200', '250', '315', '400', '500', '630', '800', '1000',
-            '1250', '1600', '2000', '2500', '3150', '4000', '5000', '6300', '8000',
-            '10000', '12500', '16000', '20000', 'dbA', 'dbC', 'dbF',
-            'Voltage','WindSpeed', 'WindDir', 'TempIns', 'TempOut', 'Humidity'
-         ]
-        presentNumericCols = site.columns.intersection(numericCols)
-        if len(presentNumericCols) > 0:
-            # site[presentNumericCols] = site[presentNumericCols].convert_objects(convert_dates= False, convert_numeric= True, convert_timedeltas= False, copy= False)
-            site[presentNumericCols].astype('float32', copy= False, raise_on_error= False)
+    return site, len(dataframes)
 
-    except KeyError:
-        pass
+def _readNvsplArchive(nvsplArchive, onlyColumns, start, end, dates):
+    """
+    Read NVSPL data from an archive made by :func:`transcodeNvspl`, selecting columns the same way
+    as ``onlyColumns`` does for text files.
+    """
+    columns = _nvsplArchiveColumns(nvsplArchive.manifest["info"]["fileColumns"], nvsplArchive.manifest["columns"], onlyColumns)
+    start, end = _nvsplArchiveRange(start, end, dates)
+    return nvsplArchive.read(columns, start, end)
 
-    if not quiet: print( "Imported {} files in {:.1f} sec".format(len(dataframes), time.time() - start_t) )
-    return site
+def _nvsplArchiveColumns(fileColumns, available, onlyColumns):
+    """
+    Translate ``onlyColumns`` (original names or positions in the NVSPL file) to the ``available``
+    columns of an archive
+    """
+    if onlyColumns is None:
+        return None
+    columns = []
+    for column in onlyColumns:
+        if isinstance(column, int):
+            column = fileColumns[column]
+        column = nvsplColumnNames.get(column, column)
+        if column != "STime" and column not in columns:
+            columns.append(column)
+    # Keep the same column order as reading the files would
+    return [ column for column in available if column in columns ]
+
+def _nvsplArchiveRange(start, end, dates):
+    """
+    The range of time to read from an archive to cover a selection.
+
+    Only whole chunks (days) need to be selected by time here; rows are trimmed exactly afterwards
+    in the same way as for text files, so that partial-date strings behave the same.
+    """
+    if dates is not None:
+        dates = pd.to_datetime(list(dates))
+        if len(dates) > 0:
+            start = max(pd.Timestamp(start), dates.min()) if start is not None else dates.min()
+            end = min(pd.Timestamp(end), dates.max()) if end is not None else dates.max()
+    if end is not None:
+        end = pd.Timestamp(end) + pd.Timedelta(days= 1)
+    return start, end
+
+def _readNvsplPyramid(nvsplPyramid, resolution, onlyColumns, start, end, hours, dates):
+    """
+    Read NVSPL data at a resolution from the coarsest level of a pyramid that fits it.
+    """
+    step = pyramid.coarsestLevel(resolution)
+    columns = _nvsplArchiveColumns(nvsplPyramid.manifest["info"]["fileColumns"], list(nvsplPyramid.columns), onlyColumns)
+    binsEnd = _nvsplBinsEnd(end, resolution)
+    archiveStart, archiveEnd = _nvsplArchiveRange(start, binsEnd, dates)
+    means, counts = nvsplPyramid.read(step, columns, archiveStart, archiveEnd)
+    means = _trimNvspl(means, start, binsEnd, hours, dates)
+    return _nvsplMeans(means, counts.loc[means.index], resolution, start, end)
+
+def _nvsplAveragedColumns(site):
+    """
+    Just the columns of NVSPL data that are averaged over time: levels and weather
+    """
+    return site[[ column for column in site.columns if column in nvsplLevels or column in nvsplWeather ]]
+
+def _nvsplMeans(means, counts, resolution, start, end):
+    """
+    Average NVSPL means (or samples) into bins of ``resolution``, and select the bins starting from start to end.
+    """
+    means, counts = pyramid.aggregate(means, counts, resolution, nvsplLevels)
+    if start is not None or end is not None:
+        means = means.loc[start:end]
+    return means
+
+def _nvsplBinsEnd(end, resolution):
+    """
+    The time of the end of the last bin of ``resolution`` that starts by ``end``.
+    """
+    if end is None:
+        return None
+    return _endOfSelection(end) + pd.Timedelta(resolution)
+
+def _endOfSelection(end):
+    """
+    The last moment included by ``end``, as when slicing with ``.loc[:end]``, where partial
+    date strings like "2013-07-02" include the whole day.
+    """
+    if isinstance(end, str):
+        try:
+            return pd.Period(end).end_time
+        except ValueError:
+            pass
+    return pd.Timestamp(end)
+
+def _selectNvsplPaths(filepaths, start= None, end= None, hours= None, dates= None):
+    """
+    Filter NVSPL file paths to just those whose hour (according to the file name) falls in the selection.
+    Files whose names can't be parsed are kept, to be trimmed after reading.
+    """
+    if start is None and end is None and hours is None and dates is None:
+        return filepaths
 
-def nvsplPaths(dataDir, unit, site, year, processed= True, partialDays= False, **kwargs):
+    start = pd.Timestamp(start) if start is not None else None
+    end = _endOfSelection(end) if end is not None else None
+    hours = set(hours) if hours is not None else None
+    dates = set( pd.to_datetime(list(dates)).date ) if dates is not None else None
+    oneHour = pd.Timedelta(hours= 1)
+
+    selected = []
+    for filepath in filepaths:
+        try:
+            _, _, hourStart = paths.splitNvsplFilename(filepath)
+        except ValueError:
+            selected.append(filepath)
+            continue
+        hourStart = pd.Timestamp(hourStart)
+        if start is not None and hourStart + oneHour <= start: continue
+        if end is not None and hourStart > end: continue
+        if hours is not None and hourStart.hour not in hours: continue
+        if dates is not None and hourStart.date() not in dates: continue
+        selected.append(filepath)
+    return selected
+
+def nvsplPaths(dataDir, unit, site, year, processed= True, partialDays= False, start= None, end= None, hours= None, dates= None, resolution= None, **kwargs):
     # **kwargs used to handle being given keyword args for nvspl() as well
     """
     Return list of pathlib.Paths to NVSPL files for a site, handling Processed_NVSPL and partial days.
@@ -132,19 +569,45 @@ def nvsplPaths(dataDir, unit, site, year, processed= True, partialDays= False, *
         If False, always use original NVSPL.
     partialDays: boolean, default False
         Whether to include any data from days with less than 24 hours of NVSPL
+    start, end : datetime-like, default None
+        Only include files covering this time range (inclusive)
+    hours : iterable of int, default None
+        Only include files from these hours of the day
+    dates : iterable of date-like, default None
+        Only include files from these days
+    resolution : str or Timedelta, default None
+        The resolution the data will be averaged to by :func:`nvspl`; files are selected
+        through the end of the last bin
 
     Returns
     -------
     list of pathlib.Path
-        Paths to all NVSPL files for this site
+        Paths to the NVSPL files for this site within the selection
 
     This function follows the signature for ``pathToData()`` as defined in :meth:`soundDENA.Accessor.__init__`.
     """
+    allPaths = _allNvsplPaths(dataDir, unit, site, processed, partialDays)
+    if resolution is not None:
+        # Whole bins will be averaged, so include files up to the end of the last bin
+        end = _nvsplBinsEnd(end, resolution)
+    return _selectNvsplPaths(allPaths, start, end, hours, dates)
+
+def _pyramidFits(resolution):
+    """
+    Whether a level of the resolution pyramid coarser than the original samples evenly divides ``resolution``.
+    Resolutions that none do (like "1.5s", or under a second) are averaged from the original samples instead.
+    """
+    try:
+        return pyramid.coarsestLevel(resolution) > pyramid.levels[0]
+    except ValueError:
+        return False
+
+def _allNvsplPaths(dataDir, unit, site, processed, partialDays):
     globPattern = "NVSPL_{}{}*.txt".format(unit, site)
 
     processedPath = dataDir/paths.processed_nvspl
-    if processed and processedPath.exists():
-        processedPaths = sorted(processedPath.glob(globPattern))
+    if processed:
+        processedPaths = catalog.glob(processedPath, globPattern)
         if len(processedPaths) > 0:
             if partialDays:
                 return processedPaths
@@ -159,12 +622,246 @@ def nvsplPaths(dataDir, unit, site, year, processed= True, partialDays= False, *
                         impartialPaths.extend(files)
                 return impartialPaths
 
-    nvsplPaths = (dataDir/paths.nvspl).glob(globPattern)
+    nvsplPaths = catalog.glob(dataDir/paths.nvspl, globPattern)
     if partialDays:
-        nvsplPaths = itertools.chain(nvsplPaths, (dataDir/paths.partial_nvspl).glob(globPattern))
+        nvsplPaths = itertools.chain(nvsplPaths, catalog.glob(dataDir/paths.partial_nvspl, globPattern))
 
     return sorted(nvsplPaths)
 
+def nvsplArchivePath(unit, site, year, processed= True, partialDays= False):
+    """
+    Where the NVSPL archive for a site is stored (within :attr:`soundDENA.paths.cache`).
+    Sites have separate archives for each combination of **processed** and **partialDays**.
+    """
+    variant = "{}{}".format("processed" if processed else "original", "_partial" if partialDays else "")
+    return paths.cache / "nvspl" / "{}_{}".format(paths.siteID(unit, site, year), variant)
+
+def _nvsplSources(filepaths):
+    # Identifies exactly which versions of which files an archive was made from.
+    # Each file is stat-ed, since editing a file in place doesn't change its directory's listing in the catalog.
+    return [ (path.name, mtime, size) for path, (mtime, size) in zip(filepaths, cache.stamp(filepaths)) ]
+
+def _nvsplSelectionSite(filepaths, processed, partialDays, start, end, hours, dates):
+    """
+    If ``filepaths`` are exactly the files :func:`nvsplPaths` selects from a site for this selection
+    (so the site's archive or pyramid holds the same data), return that site's
+    (dataDir, unit, site, year, all of its NVSPL paths). Otherwise None.
+    """
+    if len(filepaths) == 0:
+        return None
+    # NVSPL files are two levels below their site's data directory, i.e. "01 DATA/NVSPL"
+    dataDir = pathlib.Path(filepaths[0]).parents[2]
+    try:
+        unit, site, year, _ = paths.splitDataDir(dataDir)
+    except ValueError:
+        return None
+
+    allPaths = _allNvsplPaths(dataDir, unit, site, processed, partialDays)
+    if [ pathlib.Path(filepath) for filepath in filepaths ] != _selectNvsplPaths(allPaths, start, end, hours, dates):
+        return None
+    return dataDir, unit, site, year, allPaths
+
+def _freshNvsplArchive(filepaths, processed, partialDays, start, end, hours, dates):
+    """
+    The archive of the site that ``filepaths`` are the selection of (see :func:`_nvsplSelectionSite`),
+    if it's up to date. Otherwise None.
+    """
+    selectionSite = _nvsplSelectionSite(filepaths, processed, partialDays, start, end, hours, dates)
+    if selectionSite is None:
+        return None
+    dataDir, unit, site, year, allPaths = selectionSite
+    nvsplArchive = archive.ColumnArchive( nvsplArchivePath(unit, site, year, processed, partialDays) )
+    if nvsplArchive.exists() and nvsplArchive.manifest["info"].get("sources") == _nvsplSources(allPaths):
+        return nvsplArchive
+    return None
+
+def nvsplPyramid(dataDir, unit, site, year, processed= True, partialDays= False, useArchive= True, quiet= True):
+    """
+    Return the resolution pyramid of a site's NVSPL data, building it first if it doesn't exist
+    or if the NVSPL files have changed since it was built.
+
+    The pyramid holds energetic means of the site's levels (and arithmetic means of its weather columns)
+    over 10 seconds, 1 minute, 10 minutes, and 1 hour (see :mod:`soundDENA.pyramid`), stored in
+    :attr:`soundDENA.paths.cache`. ``soundDENA.nvspl(sites, resolution= ...)`` uses it automatically,
+    reading the coarsest level that evenly divides the resolution asked for.
+
+    Parameters
+    ----------
+    dataDir, unit, site, year
+        As for :func:`nvsplPaths`
+    processed, partialDays : boolean
+        Which NVSPL files to use, as in :func:`nvsplPaths`
+    useArchive : boolean, default True
+        Whether to build the pyramid from the site's archive (see :func:`transcodeNvspl`),
+        if it's up to date, instead of from the text files
+    quiet : boolean, default True
+        Whether to not print progress
+
+    Returns
+    -------
+    soundDENA.pyramid.Pyramid
+    """
+    allPaths = _allNvsplPaths(dataDir, unit, site, processed, partialDays)
+    sources = _nvsplSources(allPaths)
+    archivePath = nvsplArchivePath(unit, site, year, processed, partialDays)
+    sitePyramid = pyramid.Pyramid( archivePath.with_name(archivePath.name + "_pyramid") )
+    if sitePyramid.exists() and sitePyramid.manifest["info"].get("sources") == sources:
+        return sitePyramid
+
+    source = allPaths
+    fileColumns = None
+    if useArchive:
+        nvsplArchive = archive.ColumnArchive(archivePath)
+        if nvsplArchive.exists() and nvsplArchive.manifest["info"].get("sources") == sources:
+            source = nvsplArchive
+            fileColumns = nvsplArchive.manifest["info"]["fileColumns"]
+    if fileColumns is None:
+        fileColumns = list( pd.read_csv(str(allPaths[0]), nrows= 0).columns )
+
+    start_t = time.time()
+    days = ( _nvsplAveragedColumns(day) for day in nvsplStream(source, chunk= "1d") )
+    sitePyramid.build(days, energyColumns= nvsplLevels, info= {"sources": sources, "fileColumns": fileColumns})
+    if not quiet: print("Built NVSPL pyramid for {} in {:.1f} sec".format(paths.siteID(unit, site, year), time.time() - start_t))
+    return sitePyramid
+
+def nvsplHistograms(sites, bands= None, period= "1h", processed= True, partialDays= False, useArchive= True, start= None, end= None, hours= None, dates= None, quiet= True):
+    """
+    Build per-band histograms of each site's NVSPL levels, in one streaming pass over its data.
+
+    Exceedance levels (L90, L50, L10, ...) for any grouping of sites, hours, or days can then be
+    computed from the histograms alone, without reading the NVSPL again::
+
+        histograms = soundDENA.nvsplHistograms(soundDENA.metadata.query("unit == 'DENA'"))
+        histograms.save("DENA_histograms.npz")
+        histograms.exceedance([90, 50, 10], by= soundDENA.metadata["elevation"] > 1000)
+
+    Parameters
+    ----------
+    sites : iterable
+        :ref:`siteID` strings, or a pandas structure indexed by :ref:`siteID`
+    bands : list of str, optional
+        Which level columns (as named by :func:`nvspl`, i.e. "12.5" or "dbA") to count. Defaults to all levels.
+        Sites without some of the bands just have no counts for them.
+    period : str or Timedelta, default "1h"
+        Length of time to keep separate histograms for
+    processed, partialDays, useArchive
+        Which NVSPL data to use, as in :func:`nvsplPaths`
+    start, end, hours, dates
+        Only count data from this selection, as in :func:`nvspl`
+    quiet : boolean, default True
+        Whether to not print progress
+
+    Returns
+    -------
+    soundDENA.sketch.LevelHistograms
+        With the sites labeled by :ref:`siteID`
+    """
+    bands = bands if bands is not None else nvsplLevels
+    histograms = []
+    for dataDir, unit, site, year in paths.dataDirs(sites, quiet= quiet):
+        start_t = time.time()
+        filepaths = nvsplPaths(dataDir, unit, site, year, processed= processed, partialDays= partialDays, start= start, end= end, hours= hours, dates= dates)
+        days = nvsplStream(filepaths, chunk= "1d", start= start, end= end, hours= hours, dates= dates, processed= processed, partialDays= partialDays, useArchive= useArchive)
+        histograms.append( sketch.LevelHistograms.fromStream(days, paths.siteID(unit, site, year), bands, period) )
+        if not quiet: print("Counted levels for {} in {:.1f} sec".format(paths.siteID(unit, site, year), time.time() - start_t))
+
+    if len(histograms) == 0:
+        return sketch.LevelHistograms.empty(bands)
+    return sketch.LevelHistograms.merge(*histograms)
+
+def transcodeNvspl(sites, processed= True, partialDays= False, quiet= True, workers= None):
+    """
+    Convert each site's NVSPL text files into a chunked columnar archive, which ``soundDENA.nvspl``
+    then reads instead of the text files.
+
+    Archives are stored in :attr:`soundDENA.paths.cache`, with one chunk per day and one file per column
+    within each chunk. Reading a time range or a few columns from an archive only touches those days and
+    columns, and skips parsing text altogether. An archive records exactly which files (and their
+    modification times and sizes) it was made from; if the NVSPL files change, it's ignored until
+    it's transcoded again. Sites whose archives are already up to date are skipped.
+
+    Parameters
+    ----------
+    sites : iterable
+        :ref:`siteID` strings, or a pandas structure indexed by :ref:`siteID`
+    processed, partialDays : boolean
+        Which NVSPL files to use, as in :func:`nvsplPaths`
+    quiet : boolean, default True
+        Whether to not print progress
+    workers : int, default None
+        Number of files to parse concurrently (as in :func:`nvspl`)
+    """
+    for dataDir, unit, site, year in paths.dataDirs(sites, quiet= quiet):
+        allPaths = _allNvsplPaths(dataDir, unit, site, processed, partialDays)
+        if len(allPaths) == 0:
+            if not quiet: print("No NVSPL files for {}".format(paths.siteID(unit, site, year)))
+            continue
+
+        sources = _nvsplSources(allPaths)
+        nvsplArchive = archive.ColumnArchive( nvsplArchivePath(unit, site, year, processed, partialDays) )
+        if nvsplArchive.exists() and nvsplArchive.manifest["info"].get("sources") == sources:
+            if not quiet: print("Archive for {} is already up to date".format(paths.siteID(unit, site, year)))
+            continue
+
+        fileColumns = list( pd.read_csv(str(allPaths[0]), nrows= 0).columns )
+        days = itertools.groupby(allPaths, key= _nvsplDay)
+        chunks = ( _readNvsplFiles(list(dayPaths), 1, None, True, workers, False, None)[0] for day, dayPaths in days )
+
+        start_t = time.time()
+        nvsplArchive.write(chunks, info= {"sources": sources, "fileColumns": fileColumns})
+        if not quiet: print("Transcoded {} NVSPL files for {} in {:.1f} sec".format(len(allPaths), paths.siteID(unit, site, year), time.time() - start_t))
+
+def _nvsplDay(filepath):
+    try:
+        return paths.splitNvsplFilename(filepath)[2].date()
+    except ValueError:
+        return filepath.stem
+
+
+## SRCID schemas
+# { version: SrcidSchema }, where the version is the text of the "%%" line (i.e. "SRCID v2"),
+# or None for older files that start straight with the header.
+# ``dtypes`` gives every known column an explicit type, so the parser doesn't have to infer them.
+# ``noiseFreeSkipped`` are the columns left out of the rows for days with no noise events,
+# which have that many fewer fields; those rows' later fields are moved back under the right columns after parsing.
+SrcidSchema = collections.namedtuple("SrcidSchema", ["dtypes", "noiseFreeSkipped"])
+srcidSchemas = {
+    # Some older files call srcID "sID" (really only DENAUSLC2008 so far), and may not have tagDate
+    None: SrcidSchema({
+        "nvsplDate": str, "hr": np.float64, "secs": np.float64, "len": np.float64,
+        "srcID": np.float64, "sID": np.float64, "Hz_L": np.float64, "Hz_U": np.float64,
+        "MaxSPL": np.float64, "SEL": np.float64, "MaxSPLt": np.float64, "SELt": np.float64,
+        "userName": str, "tagDate": str
+    }, ("MaxSPLt", "SELt")),
+    "SRCID v2": SrcidSchema({
+        "nvsplDate": str, "hr": np.float64, "secs": np.float64, "len": np.float64,
+        "srcID": np.float64, "Hz_L": np.float64, "Hz_U": np.float64,
+        "MaxSPL": np.float64, "SEL": np.float64, "MaxSPLt": np.float64, "SELt": np.float64,
+        "userName": str, "tagDate": str
+    }, ("MaxSPLt", "SELt"))
+}
+# Schema for files with a version line that isn't in srcidSchemas
+srcidLatestVersion = "SRCID v2"
+srcidDateFormat = "%Y-%m-%d"
+srcidTagDateFormat = "%Y-%m-%d %H:%M:%S"
+
+def srcidPath(dataDir, unit, site, year, **kwargs):
+    # **kwargs used to handle being given keyword args for srcid() (and other filetypes' functions) as well
+    """
+    Return the pathlib.Path to a site's SRCID file.
+
+    This is the ``pathToData()`` of ``soundDENA.srcid``, and follows the signature defined in :meth:`soundDENA.Accessor.__init__`.
+    Anything else that reads a site's SRCID file finds it here.
+
+    Raises
+    ------
+    IOError
+        If the site has no SRCID file
+    """
+    path = dataDir / paths.spl / "SRCID_{}{}.txt".format(unit, site)
+    if not catalog.exists(path):
+        raise IOError("{} does not exist.".format(path))
+    return path
 
 def srcid(path):
     """
@@ -172,6 +869,7 @@ def srcid(path):
 
     The ``nvsplDate``, ``hr``, and ``secs`` columns are combined into a single DatetimeIndex for the DataFrame and dropped.
     The ``len`` column (length of the noise event) is converted to a pandas Timedelta.
+    Rows for days with no noise events have NaN for everything but ``userName`` and ``tagDate``.
 
     Returns
     -------
@@ -183,55 +881,113 @@ def srcid(path):
     with path.open() as f:
         # Determine version; older versions immediately start with header, newer has version comment
         firstline = f.readline()
-        if not firstline.startswith(r"%%"):
-            f.seek(0)   # Rewind, as we just consumed the header row.
-                        # Otherwise, we consumed the comment row, which is fine
-
+        if firstline.startswith(r"%%"):
+            version = firstline[2:].strip()
+            headerLine = f.readline()
+        else:
+            version = None
+            headerLine = firstline
+
+        schema = srcidSchemas.get(version, srcidSchemas[srcidLatestVersion])
+        columns = headerLine.rstrip("\r\n").split("\t")
+        skipped = [ column for column in schema.noiseFreeSkipped if column in columns ]
+        dtypes = { column: schema.dtypes[column] for column in columns if column in schema.dtypes }
+        # Noise-free rows have later fields (i.e. userName) in the skipped columns, so read those as text for now
+        dtypes.update({ column: object for column in skipped })
         data = pd.read_csv(f,
                             engine= "c",
                             sep= "\t",
-                            # skiprows= 1,
+                            header= None,
+                            names= columns,
+                            dtype= dtypes,
                             parse_dates= False)
 
-    # Combine nvsplDate, hr, secs columns into one DatetimeIndex
-    dates = pd.to_datetime(data.nvsplDate, infer_datetime_format= True)
-    hrs   = pd.to_timedelta(data.hr, unit= "h")
-    secs  = pd.to_timedelta(data.secs, unit= "s")
+    noisefree = _srcidRealignNoiseFree(data, skipped, schema.dtypes)
+
+    if 'sID' in data.columns:
+        # Some bizzare old files have a different name for srcID (really only DENAUSLC2008 so far)
+        data.rename(columns= {'sID': 'srcID'}, inplace= True)
+
+    # Set everything but the date and tag of noise-free rows to NaN (more appropriate than 0)
+    if noisefree is not None:
+        nanCols = data.columns.difference(("userName", "tagDate", "nvsplDate", "hr", "secs"))
+        data.loc[ noisefree, nanCols ] = np.nan
+
+    # Combine nvsplDate, hr, secs columns into one DatetimeIndex, parsing each distinct date only once
+    dateCodes, uniqueDates = pd.factorize(data.nvsplDate)
+    dateNs = np.concatenate([ _parseDistinctDates(uniqueDates, srcidDateFormat), [np.datetime64("NaT", "ns")] ]).view(np.int64)
+    times = dateNs[dateCodes] + np.round(data.hr.values * 3600e9).astype(np.int64) + np.round(data.secs.values * 1e9).astype(np.int64)
+    invalid = (dateCodes < 0) | data.hr.isnull().values | data.secs.isnull().values
+    times[invalid] = np.iinfo(np.int64).min  # NaT
 
     data.drop(["nvsplDate", "hr", "secs"], axis= 1, inplace= True)
-    data.index = dates + hrs + secs
+    data.index = pd.DatetimeIndex(times.view("datetime64[ns]"))
 
     # Turn len into timedelta
     data.len = pd.to_timedelta(data.len, unit= "s")
 
-    if 'sID' in data.columns:
-        # Some bizzare old files have a different name for srcID (really only DENAUSLC2008 so far)
-        data.rename(columns= {'sID': 'srcID'}, inplace= True)
-
-    # Days with no noise events are entered with the `MaxSPLt` and `SELt` columns skipped,
-    # so they get filled with userName and tagDate, giving them a mixed type instead of float
-    # Resolve this by finding zero-noise rows and setting all their values to NaN (more appropriate than 0)
-    if 'MaxSPLt' in data.columns:
-        if data.MaxSPLt.dtype == np.object:
-            # There are noise-free days in this dataset
-            converted = data[['MaxSPLt', 'SELt']].convert_objects(convert_numeric= True)
-            noisefree = converted.isnull().all(axis= 1)
-            data.loc[noisefree, ["userName", "tagDate"]] = data.loc[noisefree, ['MaxSPLt', 'SELt']].values
-            data[['MaxSPLt', 'SELt']] = converted
-
-            nanCols = data.columns.difference(("userName", "tagDate"))
-            data.loc[ noisefree, nanCols ] = np.nan
-    
     # Parse tagDate to datetime (though old versions don't have tagDate)
     if 'tagDate' in data.columns:
-        data.tagDate = pd.to_datetime(data.tagDate, infer_datetime_format= True)
+        tagCodes, uniqueTagDates = pd.factorize(data.tagDate)
+        tagDates = np.concatenate([ _parseDistinctDates(uniqueTagDates, srcidTagDateFormat), [np.datetime64("NaT", "ns")] ])
+        data.tagDate = tagDates[tagCodes]
 
     return data
 
+def _srcidRealignNoiseFree(data, skipped, dtypes):
+    """
+    Move the fields of rows for noise-free days, which leave out the ``skipped`` columns (read as text),
+    back under the columns they belong to, then convert the skipped columns to their ``dtypes``.
+
+    Noise-free rows are the ones whose last ``len(skipped)`` columns are empty (the row ran out of fields)
+    while a skipped column holds something that isn't a number (a field from further along).
+
+    Returns a boolean array of which rows were noise-free, or None if none were.
+    """
+    if len(skipped) == 0:
+        return None
+
+    columns = list(data.columns)
+    positions = sorted( columns.index(column) for column in skipped )
+    # Where each field from the first skipped position on belongs in a noise-free row
+    targets = [ position for position in range(positions[0], len(columns)) if position not in positions ]
+    sources = list(range(positions[0], positions[0] + len(targets)))
+
+    # Only rows that ran out of fields need checking for text in the skipped columns.
+    # Narrow down to rows missing the last field first, since checking one column of the whole frame is far cheaper.
+    short = np.flatnonzero( data.iloc[:, -1].isnull().values )
+    short = short[ data.iloc[short, len(columns) - len(skipped):].isnull().values.all(axis= 1) ]
+    shortSkipped = data.iloc[short, positions]
+    shifted = ( shortSkipped.notnull() & shortSkipped.apply(pd.to_numeric, errors= "coerce").isnull() ).values.any(axis= 1)
+    rows = short[shifted]
+
+    if len(rows) > 0 and len(targets) > 0:
+        data.iloc[rows, targets] = data.iloc[rows, sources].values
+    for column in skipped:
+        values = data[column].values.copy()
+        values[rows] = np.nan
+        data[column] = values.astype(dtypes[column])
+
+    if len(rows) == 0:
+        return None
+    noisefree = np.zeros(len(data), dtype= bool)
+    noisefree[rows] = True
+    return noisefree
+
+def _parseDistinctDates(values, format):
+    """
+    Parse an array of (distinct) date strings to datetime64[ns], with an expected format,
+    falling back to letting pandas figure it out.
+    """
+    try:
+        return pd.to_datetime(values, format= format).values.astype("datetime64[ns]")
+    except (ValueError, TypeError):
+        return pd.to_datetime(values).values.astype("datetime64[ns]")
+
 
 def loudEvents(path):
     """
-    Read a LOUNDEVENTS file into a pandas Panel.
+    Read a LOUNDEVENTS file into a :class:`soundDENA.cube.LabeledArray`.
 
     * The items axis (axis 0) is ["above", "all", "percent"]. So you'd use ``events["above"]`` to get a
       sub-DataFrame of events that exceeded $L_{nat}$, where rows are indexed by date, and columns from 0 to 23 hours.
@@ -240,7 +996,7 @@ def loudEvents(path):
 
     Returns
     -------
-    Panel
+    LabeledArray
     """
 
     data = pd.read_csv(str(path) if isinstance(path, pathlib.Path) else path,
@@ -251,18 +1007,14 @@ def loudEvents(path):
                         infer_datetime_format= True)
 
     if data.index.name is not None: data.index.name = data.index.name.lower()
-    data.columns = list(range(24)) * 3
-
-    paneldata = pd.Panel({
-                            "above": data.iloc[:, 0:24],
-                            "all": data.iloc[:, 24:48],
-                            "percent": data.iloc[:, 48:72]
-                        })
+    # The three tables are side by side in the file, so splitting the columns into thirds and moving them to the front gives all three at once
+    # Any non-numeric cells become NaN
+    values = data.apply(pd.to_numeric, errors= "coerce").values.astype(np.float64).reshape(len(data), 3, 24).transpose(1, 0, 2)
+    return cube.LabeledArray(values, [ ["above", "all", "percent"], data.index, pd.Index(range(24), name= "hour") ])
 
-    paneldata.minor_axis.name = "hour"
-
-    return paneldata
 
+## The files in each site's `paths.wav` directory read by `audibility`
+audibilityPattern = "LA_*.txt"
 
 def audibility(dirpath):
     ## TODO: doc
@@ -271,7 +1023,7 @@ def audibility(dirpath):
         dirpath = pathlib.Path(dirpath)
 
     dataframes = []
-    for filepath in sorted(dirpath.glob("LA_*.txt")):
+    for filepath in catalog.glob(dirpath, audibilityPattern):
         with filepath.open("rb") as f:
             header = None
             metadata = {}
@@ -402,7 +1154,7 @@ class metricsReader:
                   - `season`: ex. "Summer", "Winter"
                   - `n`     : ex. "n = 32 days", "n = 467hrs", "n = 16"
         
-        `metric`: a specific kind of data. Metrics can be composed from multiple tables, using a multidimensional Panel data structure
+        `metric`: a specific kind of data. Metrics can be composed from multiple tables, using a multidimensional LabeledArray (see :mod:`soundDENA.cube`)
                  (i.e. the "ambient" metric might be composed from the "Ambient (dBA)" and "Ambient (dBT)" tables
                   from both the seasons "Summer" and "Winter")
         
@@ -412,7 +1164,7 @@ class metricsReader:
         
         `tableType` : the distinguishing factor between tables of the same metric.
                       ex. "dBA", "dBT", "night", "day", "l90", "lnat", "l50", ...
-                      `tableType` becomes the items axis in a metrics Panel:
+                      `tableType` becomes the items axis in a metrics LabeledArray:
                       the index order goes [season, tableType, <percentile, hour, srcid, etc>, <percentile, hour, srcid, etc>]
 
         So, `metricNames` should be a mapping from `{ metricName : { tableType: tableName, tableType: tableName... }, ... }`.
@@ -439,13 +1191,18 @@ class metricsReader:
         self.Metrics = collections.namedtuple('Metrics', list(metricNames.keys()) + ["metadata"] )
         self.Metric = collections.namedtuple('Metric', ["data", "n"])
 
+        # These named tuple classes only exist on this reader, so pickle can't find them by name.
+        # Pickle them by reference to the reader's version instead (so they can be cached, or sent between processes).
+        self.Metrics.__reduce__ = lambda metrics: (_rebuildMetrics, (readerVersion, "Metrics", tuple(metrics)))
+        self.Metric.__reduce__ = lambda metric: (_rebuildMetrics, (readerVersion, "Metric", tuple(metric)))
+
         self.Metrics.__doc__ += '\n\nEach metric is stored as a named tupe, with attributes `data` and `n`.'
         self.Metrics.__doc__ += '\nFor example, if this named tuple is named `metrics`:'
         self.Metrics.__doc__ += '\n    `metrics.noiseFreeInterval.data` would return a pandas DataFrame'
         self.Metrics.__doc__ += '\n    `metrics.noiseFreeInterval.n`    would return a pandas Series of TimeDeltas of the length of the dataset for each season'
         self.Metrics.__doc__ += '\n\nMetadata is available as a dict in `metrics.metadata`.'
 
-        self.Metric.__doc__   += '\n\n`data`: a pandas Panel, indexed either by [season, tableType, <column>, <row>] or [season, <column>, <row>]'
+        self.Metric.__doc__   += '\n\n`data`: a soundDENA.cube.LabeledArray, indexed either by [season, tableType, <column>, <row>] or [season, <column>, <row>]'
         self.Metric.__doc__   += '\n`n`     : a pandas DataFrame or Series of the length of this dataset (as TimeDeltas). The primary key is season, secondary key (if applicable) is tableType'
         # TODO: repr() for Metric and Metrics
 
@@ -476,7 +1233,7 @@ class metricsReader:
         Missing metrics are stored as None. (SPLAT-related metrics such as ``noiseFreeInterval`` are often missing.)
 
         Otherwise, each attribute for a table has two attributes itself: ``data`` and ``n``. ``data`` contains a
-        pandas Panel of that table's data. ``n`` contains a DataFrame or Series of TimeDeltas of the
+        :class:`soundDENA.cube.LabeledArray` of that table's data. ``n`` contains a DataFrame or Series of TimeDeltas of the
         lengths of the dataset, by season and table type.
 
         In other words, the retured object is structured::
@@ -484,13 +1241,13 @@ class metricsReader:
             metrics
                 metadata: {"Day": "07:00:00 to 18:59:59", "Source of Interest": "Aircraft", ...}
                 hourlyMedian
-                    data: Panel
+                    data: LabeledArray
                     n: DataFrame
                 frequency
-                    data: Panel
+                    data: LabeledArray
                     n: DataFrame
                 ambient
-                    data: Panel
+                    data: LabeledArray
                     n: DataFrame
                 ...
                 ...
@@ -498,10 +1255,10 @@ class metricsReader:
 
         A primary purpose of this reader is to combine multiple tables of related data in the metrics file
         into single structures. (For example, Median Hourly Metrics could have four tables, for dBA and dBT
-        in both Summer and Winter. These are combined into a single Panel, making it easy to perform complex
+        in both Summer and Winter. These are combined into a single LabeledArray, making it easy to perform complex
         selections across the tables---e.g. dBA in both seasons.)
 
-        Here's how these ``data`` Panels are indexed:
+        Here's how these ``data`` LabeledArrays are indexed (their axes are named like Panels' were, so ``items``, ``major_axis``, etc. still work):
 
             + For metrics composed of multiple tables:
                 - Labels axis: Season        ("Winter", "Summer", ...)
@@ -528,13 +1285,13 @@ class metricsReader:
         Examples (where the object returned from this function is stored as ``metrics``)::
 
             >> metrics.noiseFreeInterval.data
-            -> a Panel of the SPLAT Noise Free Interval (sec) table for each season, indexed by [season, percentile, hour]
+            -> a 3D LabeledArray of the SPLAT Noise Free Interval (sec) table for each season, indexed by [season, percentile, hour]
 
             >> metrics.noiseFreeInterval.n
             -> a Series of the number of days used to compute the noise free interval metric, with one row per season
 
             >> metrics.hourlyMedian.data
-            -> a Panel4D of the Median Hourly Metrics tables for dBA and dBT for each season, indexed by [season, spl weighting, percentile, hour]
+            -> a 4D LabeledArray of the Median Hourly Metrics tables for dBA and dBT for each season, indexed by [season, spl weighting, percentile, hour]
 
             >> metrics.hourlyMedian.data.Summer.dBA
             >> metrics.hourlyMedian.data.loc["Summer", "dBA"]
@@ -565,7 +1322,13 @@ class metricsReader:
 
         with open(str(path)) as f:
             txt = f.read()
+        return self.parseText(txt, path)
 
+    def parseText(self, txt, path= None):
+        """
+        Read all tables from the text of a metrics file (see :meth:`__call__`).
+        ``path`` is only used in warnings and errors.
+        """
         sections = txt.split("\n\n")[:-1] # file is terminated by double-linebreak, so we don't need the final empty section
         header, *tableText = sections
 
@@ -589,16 +1352,12 @@ class metricsReader:
         metrics = collections.defaultdict( lambda: collections.defaultdict(dict) ) # map of { metricName: {season: {tableType: DataFrame}} }
         ns = collections.defaultdict( lambda: collections.defaultdict(dict) )      # map of { metricName: {season: {tableType: n}} }
 
-        titleRe = re.compile(r"(.*),\s?(.*?)\s?\((.*)\)")  # match metric name, season, n
-        nRe     = re.compile(r"n = (\d+) ?(.*)")           # match (optional) unit and length from an n
-
         for table in tableText:
-            titleLine, *lines = table.split("\n")
-            cells = [ line.split("\t") for line in lines ]
-            columns, *body = cells
-            
+            titleLine, columnLine, *lines = table.split("\n")
+            columns = columnLine.split("\t")
+
             # Split title parts, and look up the canonical table name for this metric name
-            match = titleRe.match(titleLine)
+            match = _metricsTitleRe.match(titleLine)
             try:
                 title, season, n = match.groups()
                 if title == "Time Above (%)":
@@ -613,65 +1372,54 @@ class metricsReader:
                     else:
                         raise ValueError("Time Above (%) table with unexpected units: {}".format(columns))
                 metricName, tableType = self.titlesToMetricNamesAndTypes[title]
-            except ValueError:
-                warnings.warn("Unparseable title: {} (in {})".format(title, path))
+            except (ValueError, AttributeError):
+                warnings.warn("Unparseable title: {} (in {})".format(titleLine, path))
                 continue
             except KeyError:
-                warnings.warn("Unknown metric {} (in {})".format(metric, path))
+                warnings.warn("Unknown metric {} (in {})".format(title, path))
                 continue
-                
-            # Get n-value from title
-            match = nRe.match(n)
-            try:
-                amt, unit = match.groups()
-                if unit == "hrs" or unit == "": n = pd.to_timedelta(amt, unit= "h")
-                elif unit == "days": n = pd.to_timedelta(amt, unit= "d")
-                else: n = pd.to_timedelta(amt, unit= unit)
-            except (ValueError, AttributeError):
-                n = pd.to_timedelta('NaT')
-            ns[metricName][season][tableType] = n
-            
-            # Create DataFrame
-            df = pd.DataFrame(body)
-            
-            df.set_index(0, inplace= True)
-            df.index.name= None
-            df.columns = columns[1:]
-            df = df.convert_objects(convert_dates= False, convert_numeric= True, convert_timedeltas= False, copy= False)
-            for column, dtype in df.dtypes.iteritems():
-                if dtype == np.object:
-                    # Force any non-numeric column to be all NaN. Currently (pandas 0.16.1), convert_objects
-                    # will only leave columns as objects if they contain 0 convertible numeric values, so we
-                    # *should* be safe assuming no actual data is dropped.
-                    df[column] = np.nan
-            
-            # Guess the type of the index (if it's noise level, or hour)
-            for axname in ("index", "columns"):
-                axis = getattr(df, axname)
-                if axis.str.startswith("L").all():
-                    #L_x levels
-                    axis.name = "percentile"
-                elif axis.str.endswith("h").all():
-                    # Hours
-                    axis = axis.str.rstrip("h").astype("int")
-                    axis.name = "hour"
-                    setattr(df, axname, axis)
-            
+
+            ns[metricName][season][tableType] = _metricsN(n)
+
+            # Tokenize the body straight into floats, with each axis's labels parsed once per distinct set of labels
+            rowLabels, values = _tokenizeMetricsTable(lines, len(columns) - 1)
+            df = pd.DataFrame(values, index= _metricsAxis(tuple(rowLabels)).copy(), columns= _metricsAxis(tuple(columns[1:])).copy(), copy= False)
+
             # Ensure percentTimeAbove has the same columns names in both tables: just dB instead of dBA and dBT
             if metricName == "percentTimeAbove":
                 df.columns = df.columns.str.slice(stop= -1)
-                
+
             metrics[metricName][season][tableType] = df
 
-        ## Create Panels for each metric from their component DataFrames of each table 
-        metrics = { metricName: pd.Panel4D(panelDict) for metricName, panelDict in metrics.items() }
+        return self.assemble(header, metrics, ns)
+
+    def assemble(self, header, metrics, ns):
+        """
+        Combine the DataFrames of individual tables into the named tuple returned by :meth:`__call__`.
+
+        Used both for tables parsed from a metrics file, and for tables computed from NVSPL and SRCID
+        data (see :mod:`soundDENA.compute`), so both come out in exactly the same structure.
+
+        Parameters
+        ----------
+        header : dict
+            Metadata from the file's header, with lowercase keys
+        metrics : dict of { metricName: {season: {tableType: DataFrame}} }
+            ``tableType`` is None for metrics made of just one table
+        ns : dict of { metricName: {season: {tableType: Timedelta}} }
+            Length of the data used for each table
+
+        Returns
+        -------
+        Metrics
+        """
+        ## Create a LabeledArray for each metric from their component DataFrames of each table
+        metrics = { metricName: cube.LabeledArray.fromFrames(panelDict, names= ["Season", "Table"]) for metricName, panelDict in metrics.items() }
         for metricName, metric in metrics.items():
-            # Metrics derived from a single table will have seasons as labels, and a superfluous items axis of [None]
-            # Reduce them to just a 3D panel with seasons as items axis
-            metric.labels.name = "Season"
-            metric.items.name = "Table"
-            if all( metric.items == [None] ):
-                metrics[metricName] = metric.loc[:, None, :, :]
+            # Metrics derived from a single table will have a superfluous Table axis of [None]
+            # Reduce them to 3 dimensions, with seasons as the first axis
+            if list(metric.axes[1]) == [None]:
+                metrics[metricName] = metric.iloc[:, 0]
 
         ## Create DataFrame/Series of n values for each table in metric
         ns = { metricName: pd.DataFrame(nVals) for metricName, nVals in ns.items() }
@@ -680,32 +1428,23 @@ class metricsReader:
             # Reduce them to just a Series, with season as the index
             n.columns.name = "Season"
             n.index.name = "Table"
-            if all( n.index == [None] ):
+            if list(n.index) == [None]:
                 ns[metricName] = n.iloc[0]
 
         ## Combine day and night levels
-        try:
+        if "frequency" in metrics:
+            # Table types are "day" and "night"
             freq = metrics["frequency"]
-            for season in freq.labels:
-                freq.loc[season, "overall"] = self.splMean(freq.loc[season, "day"], freq.loc[season, "night"])
-        except KeyError:
-            pass
+            metrics["frequency"] = freq.append("Table", "overall", self.splMean(freq.loc[:, "day"].values, freq.loc[:, "night"].values))
 
-        try:
-            ambient = metrics["ambient"].transpose('labels', 'major_axis', 'items', 'minor_axis')
-            for season in ambient.labels:
-                ambient.loc[season, "overall"] = self.splMean(ambient.loc[season, "Day"], ambient.loc[season, "Night"])
-            metrics["ambient"] = ambient.transpose('labels', 'major_axis', 'items', 'minor_axis')
-        except KeyError:
-            pass
+        if "ambient" in metrics:
+            # Rows (the third axis) are "Day" and "Night"
+            ambient = metrics["ambient"]
+            metrics["ambient"] = ambient.append(2, "overall", self.splMean(ambient.loc[:, :, "Day"].values, ambient.loc[:, :, "Night"].values))
 
-        try:
-            pta = metrics["percentTimeAbove"].transpose('labels', 'major_axis', 'items', 'minor_axis')
-            for season in pta.labels:
-                pta.loc[season, "overall"] = (pta.loc[season, "Day"] + pta.loc[season, "Night"]) / 2
-            metrics["percentTimeAbove"] = pta.transpose('labels', 'major_axis', 'items', 'minor_axis')
-        except KeyError:
-            pass
+        if "percentTimeAbove" in metrics:
+            pta = metrics["percentTimeAbove"]
+            metrics["percentTimeAbove"] = pta.append(2, "overall", (pta.loc[:, :, "Day"].values + pta.loc[:, :, "Night"].values) / 2)
 
 
         ## Bundle into a Metrics named-tuple and return
@@ -728,15 +1467,81 @@ metricsVersions = {
 
 metricsReaders = { version: metricsReader(version, metricNames) for version, metricNames in metricsVersions.items() }
 
+def _rebuildMetrics(version, className, values):
+    # Unpickle a Metrics or Metric named tuple, using the classes of the reader for its version
+    return getattr(metricsReaders[version], className)(*values)
+
 def metrics(path):
+    # Read the file once, and pick the reader for its version from the first line of the text
     with open(str(path)) as f:
-        versionLine = f.readline()
+        txt = f.read()
 
-    version = metricsReader.parseVersionLine(versionLine)
+    version = metricsReader.parseVersionLine(txt.split("\n", 1)[0])
     try:
-        return metricsReaders[version](path)
+        reader = metricsReaders[version]
     except KeyError:
         raise TypeError("No metrics reader for version {}".format(version))
+    return reader.parseText(txt, path)
+
+## Metrics table parsing
+_metricsTitleRe = re.compile(r"(.*),\s?(.*?)\s?\((.*)\)")  # match metric name, season, n
+_metricsNRe     = re.compile(r"n = (\d+) ?(.*)")           # match (optional) unit and length from an n
+
+def _metricsN(n):
+    """
+    Parse the n-value from a table title (i.e. "n = 32 days", "n = 467hrs") into a Timedelta
+    """
+    match = _metricsNRe.match(n)
+    try:
+        amt, unit = match.groups()
+        if unit == "hrs" or unit == "": return pd.to_timedelta(int(amt), unit= "h")
+        elif unit == "days": return pd.to_timedelta(int(amt), unit= "d")
+        else: return pd.to_timedelta(int(amt), unit= unit)
+    except (ValueError, AttributeError):
+        return pd.to_timedelta('NaT')
+
+def _tokenizeMetricsTable(lines, nColumns):
+    """
+    Split the lines of a table body into row labels and a 2D float array of the values.
+    Cells that aren't numbers (or are missing, in short rows) become NaN.
+    """
+    rows = [ line.split("\t") for line in lines ]
+    labels = [ row[0] for row in rows ]
+    cells = [ row[1:] for row in rows ]
+    try:
+        # Fast path: numpy parses every cell in one go
+        values = np.array(cells, dtype= np.float64)
+        if values.shape == (len(rows), nColumns):
+            return labels, values
+    except ValueError:
+        pass
+
+    values = np.full((len(rows), nColumns), np.nan)
+    for i, row in enumerate(cells):
+        for j, cell in enumerate(row[:nColumns]):
+            try:
+                values[i, j] = float(cell)
+            except ValueError:
+                pass
+    return labels, values
+
+@functools.lru_cache(maxsize= 1024)
+def _metricsAxis(labels):
+    """
+    Guess the type of an axis of a metrics table (noise levels, or hours) from its labels.
+    Metrics files all use the same few sets of labels, so each set is only parsed once
+    (callers should copy the cached Index before handing it out, so it's never renamed in place).
+    """
+    if all( label.startswith("L") for label in labels ):
+        # L_x levels
+        return pd.Index(labels, name= "percentile")
+    if all( label.endswith("h") for label in labels ):
+        # Hours
+        try:
+            return pd.Index([ int(label.rstrip("h")) for label in labels ], name= "hour")
+        except ValueError:
+            pass
+    return pd.Index(labels)
 
 metrics.__doc__ = metricsReader.__call__.__doc__
 
@@ -745,9 +1550,19 @@ metrics.__doc__ = metricsReader.__call__.__doc__
 # added to the module's namespace.
 accessorExports = {
     "nvspl": (nvspl, nvsplPaths),
-    "srcid": (srcid, paths.spl / "SRCID_{unit}{site}.txt"),
+    "srcid": (srcid, srcidPath),
     "loudevents": (loudEvents, paths.spl / "LOUDEVENTS_{unit}{site}.txt"),
     "audibility": (audibility, paths.wav),
     "dailypa": (dailyPA, paths.spl / "DAILYPA_{unit}{site}.txt"),
     "metrics": (metrics, paths.spl / "METRICS_{unit}{site}.txt")
 }
+
+# { "filetype": streamFunc } for filetypes that can be read in chunks with Accessor.stream
+accessorStreams = {
+    "nvspl": nvsplStream
+}
+
+# { "filetype": pattern } for filetypes whose pathToData is a directory, giving the files in it the parser reads
+accessorSourcePatterns = {
+    "audibility": audibilityPattern
+}
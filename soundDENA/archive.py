@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd
+import pathlib
+import pickle
+import shutil
+import os
+
+"""
+Chunked columnar archives of time-indexed data
+
+An archive is a directory holding a sequence of chunks (i.e. one per day), each of which stores
+every column as its own ``.npy`` file, plus the chunk's time index. A sidecar index of each
+chunk's first and last time is kept in the archive's manifest, so reading a time range only
+opens the chunks that overlap it, and reading a few columns only opens those columns' files.
+Column files are memory-mapped, so only the rows actually selected are read from disk.
+
+Layout::
+
+    <archive directory>/
+        manifest.pkl        # columns, dtypes, chunk time ranges, and any extra info about the source
+        00000/
+            _time.npy       # int64 nanoseconds since the epoch
+            0000.npy        # first column
+            0001.npy        # second column
+            ...
+        00001/
+            ...
+"""
+
+class ColumnArchive:
+    """
+    A chunked, column-oriented archive of a DataFrame indexed by time.
+    """
+    _timeFile = "_time.npy"
+
+    def __init__(self, directory):
+        self.directory = pathlib.Path(directory)
+        self._manifest = None
+
+    @property
+    def manifest(self):
+        """
+        The archive's manifest dict, or None if the archive doesn't exist (or is unreadable).
+        """
+        if self._manifest is None:
+            try:
+                with (self.directory / "manifest.pkl").open("rb") as f:
+                    self._manifest = pickle.load(f)
+            except Exception:
+                return None
+        return self._manifest
+
+    def exists(self):
+        return self.manifest is not None
+
+    @property
+    def columns(self):
+        return pd.Index(self.manifest["columns"])
+
+    @staticmethod
+    def _fileName(columnNumber):
+        # Column labels may not be valid file names, so files are named by position
+        return "{:04d}.npy".format(columnNumber)
+
+    def write(self, chunks, info= None):
+        """
+        Write an archive from an iterable of DataFrames, replacing any existing archive.
+
+        Each chunk must be indexed by time and have the same columns. Chunks should be given
+        in chronological order. The archive is written to a temporary directory and moved
+        into place at the end, so a partially-written archive is never read.
+
+        Parameters
+        ----------
+        chunks : iterable of DataFrame
+        info : dict, optional
+            Extra information to store in the manifest (i.e. what the archive was made from)
+        """
+        tmpDirectory = self.directory.with_name(self.directory.name + ".tmp{}".format(os.getpid()))
+        if tmpDirectory.exists():
+            shutil.rmtree(str(tmpDirectory))
+        tmpDirectory.mkdir(parents= True)
+
+        columns = None
+        dtypes = None
+        indexName = None
+        chunkRanges = []
+        for chunk in chunks:
+            if len(chunk) == 0:
+                continue
+            if columns is None:
+                columns = list(chunk.columns)
+                dtypes = [ chunk[column].dtype for column in columns ]
+                indexName = chunk.index.name
+            elif list(chunk.columns) != columns:
+                shutil.rmtree(str(tmpDirectory))
+                raise ValueError("All chunks in an archive must have the same columns")
+
+            chunkDirectory = tmpDirectory / "{:05d}".format(len(chunkRanges))
+            chunkDirectory.mkdir()
+            times = chunk.index.values.astype("datetime64[ns]").view(np.int64)
+            np.save(str(chunkDirectory / self._timeFile), times)
+            for i, column in enumerate(columns):
+                values = chunk[column].values
+                np.save(str(chunkDirectory / self._fileName(i)), values, allow_pickle= values.dtype == object)
+            chunkRanges.append( (chunkDirectory.name, int(times.min()), int(times.max()), len(times)) )
+
+        manifest = {
+            "columns": columns if columns is not None else [],
+            "dtypes": dtypes if dtypes is not None else [],
+            "indexName": indexName,
+            "chunks": chunkRanges,
+            "info": info if info is not None else {}
+        }
+        with (tmpDirectory / "manifest.pkl").open("wb") as f:
+            pickle.dump(manifest, f, protocol= pickle.HIGHEST_PROTOCOL)
+
+        if self.directory.exists():
+            shutil.rmtree(str(self.directory))
+        os.replace(str(tmpDirectory), str(self.directory))
+        self._manifest = manifest
+
+    def _selectChunks(self, start, end):
+        lo = pd.Timestamp(start).value if start is not None else None
+        hi = pd.Timestamp(end).value if end is not None else None
+        for name, chunkStart, chunkEnd, rows in self.manifest["chunks"]:
+            if lo is not None and chunkEnd < lo: continue
+            if hi is not None and chunkStart > hi: continue
+            yield name
+
+    def iterChunks(self, columns= None, start= None, end= None):
+        """
+        Yield DataFrames of each chunk's data within a time range, in chronological order,
+        reading only the given columns.
+
+        Parameters
+        ----------
+        columns : list, optional
+            Column labels to read. Defaults to all columns.
+        start, end : datetime-like, optional
+            Only include rows in this time range (inclusive)
+        """
+        allColumns = self.manifest["columns"]
+        if columns is None:
+            columns = allColumns
+        positions = [ allColumns.index(column) for column in columns ]
+        lo = pd.Timestamp(start).value if start is not None else None
+        hi = pd.Timestamp(end).value if end is not None else None
+
+        for name in self._selectChunks(start, end):
+            chunkDirectory = self.directory / name
+            times = np.load(str(chunkDirectory / self._timeFile), mmap_mode= "r")
+            first = np.searchsorted(times, lo, side= "left") if lo is not None else 0
+            last = np.searchsorted(times, hi, side= "right") if hi is not None else len(times)
+            if first >= last:
+                continue
+
+            data = {}
+            for column, position in zip(columns, positions):
+                path = str(chunkDirectory / self._fileName(position))
+                if self.manifest["dtypes"][position] == object:
+                    values = np.load(path, allow_pickle= True)[first:last]
+                else:
+                    values = np.array( np.load(path, mmap_mode= "r")[first:last] )
+                data[column] = values
+
+            index = pd.DatetimeIndex( np.array(times[first:last]).view("datetime64[ns]"), name= self.manifest["indexName"] )
+            yield pd.DataFrame(data, index= index, columns= columns)
+
+    def read(self, columns= None, start= None, end= None):
+        """
+        Read the archive (or a subset of its columns and time range) into one DataFrame.
+        """
+        frames = list(self.iterChunks(columns, start, end))
+        if len(frames) == 0:
+            columns = columns if columns is not None else self.manifest["columns"]
+            return pd.DataFrame(columns= columns, index= pd.DatetimeIndex([], name= self.manifest["indexName"]))
+        return pd.concat(frames)
@@ -0,0 +1,343 @@
+from . import paths
+from . import catalog
+
+import pathlib
+import pickle
+import hashlib
+import zlib
+import struct
+import os
+import sys
+import copy
+import collections
+import threading
+import numpy as np
+import pandas as pd
+
+"""
+Caching of parsed data, so files that haven't changed don't need to be parsed again.
+
+Cache entries are identified by the filetype, the path(s) of the file(s) parsed, and the
+keyword arguments given to the parser. Each entry also records a *stamp* of the source
+files (their modification times and sizes); an entry whose stamp no longer matches the
+files on disk is stale and is rebuilt.
+"""
+
+def sourceFiles(filePath, pattern= "*"):
+    """
+    Normalize the result of an Accessor's ``pathToData`` into a list of pathlib.Paths,
+    or return None if it isn't something whose files can be stamped.
+
+    A directory is expanded to itself plus the files in it matching ``pattern``
+    (the files its parser reads), since editing a file in place doesn't change the directory's
+    own modification time or size.
+    """
+    if isinstance(filePath, (str, pathlib.Path)):
+        filePath = pathlib.Path(filePath)
+        if filePath.is_dir():
+            return [filePath] + catalog.glob(filePath, pattern)
+        return [filePath]
+    try:
+        filePaths = list(filePath)
+    except TypeError:
+        return None
+    if all( isinstance(path, pathlib.Path) for path in filePaths ):
+        return filePaths
+    return None
+
+def stamp(filePaths):
+    """
+    Return a tuple of (modification time, size) for each path, used to tell if any source files changed.
+
+    Raises OSError if a file doesn't exist.
+    """
+    stats = ( os.stat(str(path)) for path in filePaths )
+    return tuple( (stat.st_mtime_ns, stat.st_size) for stat in stats )
+
+def identity(name, filePaths, kwargs):
+    """
+    The identity of a cache entry: the filetype, which files were read, and how.
+    """
+    return (name, tuple(str(path) for path in filePaths), repr(sorted(kwargs.items())))
+
+def entryName(entryIdentity):
+    """
+    A filename-safe digest of an entry identity
+    """
+    return hashlib.sha1(repr(entryIdentity).encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """
+    A directory of pickled Accessor results, with a total size quota and least-recently-used eviction.
+
+    Each entry file holds a small header with a CRC32 checksum of the pickled payload.
+    Entries that fail the checksum (i.e. from a crash midway through writing, or disk corruption)
+    are deleted and treated as missing, so they'll be rebuilt from the source files.
+    """
+    _magic = b"sDENAc01"
+    _header = struct.Struct("<8sIQ")  # magic, crc32 of payload, payload length
+
+    def __init__(self, directory, quota):
+        """
+        Parameters
+        ----------
+        directory : str or pathlib.Path
+            Where to store cache entries. Created if it doesn't exist.
+        quota : int
+            Maximum total size of the cache in bytes. When exceeded, the least-recently-used
+            entries are deleted.
+        """
+        self.directory = pathlib.Path(directory)
+        self.quota = quota
+        self.directory.mkdir(parents= True, exist_ok= True)
+
+    def _path(self, entryIdentity):
+        return self.directory / (entryName(entryIdentity) + ".pkl")
+
+    def get(self, entryIdentity, entryStamp):
+        """
+        Return the cached data for this identity and stamp, or None if there is no valid entry.
+        """
+        path = self._path(entryIdentity)
+        try:
+            with path.open("rb") as f:
+                magic, checksum, length = self._header.unpack( f.read(self._header.size) )
+                payload = f.read()
+        except (OSError, struct.error):
+            return None
+
+        if magic != self._magic or len(payload) != length or zlib.crc32(payload) != checksum:
+            self._remove(path)
+            return None
+
+        try:
+            storedIdentity, storedStamp, data = pickle.loads(payload)
+        except Exception:
+            self._remove(path)
+            return None
+
+        if storedIdentity != entryIdentity or storedStamp != entryStamp:
+            # Source files have changed since this was cached
+            return None
+
+        # Touch the entry to mark it recently used
+        try:
+            os.utime(str(path), None)
+        except OSError:
+            pass
+        return data
+
+    def put(self, entryIdentity, entryStamp, data):
+        """
+        Store data in the cache. Data that can't be pickled is silently not cached.
+        """
+        try:
+            payload = pickle.dumps( (entryIdentity, entryStamp, data), protocol= pickle.HIGHEST_PROTOCOL )
+        except (pickle.PicklingError, AttributeError, TypeError):
+            return
+
+        path = self._path(entryIdentity)
+        tmpPath = path.with_suffix(".tmp{}".format(os.getpid()))
+        try:
+            with tmpPath.open("wb") as f:
+                f.write( self._header.pack(self._magic, zlib.crc32(payload), len(payload)) )
+                f.write(payload)
+            os.replace(str(tmpPath), str(path))
+        except OSError:
+            self._remove(tmpPath)
+            return
+
+        self.evict()
+
+    def evict(self):
+        """
+        Delete least-recently-used entries until the cache fits in its quota.
+        """
+        entries = []
+        for path in self.directory.glob("*.pkl"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append( (stat.st_mtime, stat.st_size, path) )
+
+        total = sum( size for _, size, _ in entries )
+        for _, size, path in sorted(entries, key= lambda entry: entry[0]):
+            if total <= self.quota:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        """
+        Delete every entry in the cache.
+        """
+        for path in self.directory.glob("*.pkl"):
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def sizeof(data):
+    """
+    Approximate size of parsed data in bytes, using pandas' memory usage for pandas structures.
+    """
+    if isinstance(data, pd.DataFrame):
+        return int( data.memory_usage(index= True, deep= True).sum() )
+    if isinstance(data, pd.Series):
+        return int( data.memory_usage(index= True, deep= True) )
+    if isinstance(data, np.ndarray):
+        return data.nbytes
+    if hasattr(data, "values") and isinstance(getattr(data, "values"), np.ndarray):
+        # Other array-backed structures, i.e. soundDENA.cube.LabeledArray
+        return data.values.nbytes
+    if isinstance(data, (tuple, list)):
+        return sum( sizeof(item) for item in data )
+    if isinstance(data, dict):
+        return sum( sizeof(item) for item in data.values() )
+    return sys.getsizeof(data)
+
+def protectedCopy(data):
+    """
+    Copy parsed data deeply enough that modifying the copy can't modify the original.
+    """
+    if isinstance(data, (pd.core.generic.NDFrame, np.ndarray)):
+        return data.copy()
+    if isinstance(data, tuple) and hasattr(data, "_make"):
+        # named tuple, i.e. from the metrics reader
+        return data._make( protectedCopy(item) for item in data )
+    if isinstance(data, (tuple, list)):
+        return type(data)( protectedCopy(item) for item in data )
+    if isinstance(data, dict):
+        return { key: protectedCopy(value) for key, value in data.items() }
+    return copy.deepcopy(data)
+
+
+class MemoryCache:
+    """
+    An in-process cache of parsed Accessor results, limited to a total size in bytes,
+    evicting the least-recently-used results first.
+
+    Results are copied going in and coming out, so callers can modify what they're given
+    without corrupting the cache.
+    """
+    def __init__(self, budget):
+        """
+        Parameters
+        ----------
+        budget : int
+            Maximum total size (as measured by :func:`sizeof`) of cached results, in bytes
+        """
+        self.budget = budget
+        self.size = 0
+        self._entries = collections.OrderedDict()  # { identity: (stamp, data, size) }, least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, entryIdentity, entryStamp):
+        """
+        Return a copy of the cached data for this identity and stamp, or None if there is no valid entry.
+        """
+        with self._lock:
+            try:
+                storedStamp, data, size = self._entries[entryIdentity]
+            except KeyError:
+                return None
+            if storedStamp != entryStamp:
+                # Source files have changed, so this entry is useless now
+                del self._entries[entryIdentity]
+                self.size -= size
+                return None
+            self._entries.move_to_end(entryIdentity)
+        return protectedCopy(data)
+
+    def put(self, entryIdentity, entryStamp, data):
+        """
+        Store a copy of data in the cache. Data larger than the whole budget is not cached.
+        """
+        size = sizeof(data)
+        if size > self.budget:
+            return
+        data = protectedCopy(data)
+        with self._lock:
+            if entryIdentity in self._entries:
+                self.size -= self._entries.pop(entryIdentity)[2]
+            self._entries[entryIdentity] = (entryStamp, data, size)
+            self.size += size
+            while self.size > self.budget:
+                _, (_, _, evictedSize) = self._entries.popitem(last= False)
+                self.size -= evictedSize
+
+    def clear(self):
+        """
+        Drop every entry in the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+## The caches used by all Accessors. None (the default) means that kind of caching is off.
+memoryCache = None
+diskCache = None
+
+def enableDiskCache(directory= None, quota= 20 * 2**30):
+    """
+    Turn on caching of parsed data to disk for all Accessors.
+
+    Once enabled, :meth:`soundDENA.Accessor.access` first looks for a cached result
+    for the same filetype, file(s), and keyword arguments, and only parses the files
+    if there is none, or if any of the files' modification times or sizes have changed.
+
+    Parameters
+    ----------
+    directory : str or pathlib.Path, optional
+        Where to store the cache. Defaults to the ``accessors`` folder in :attr:`soundDENA.paths.cache`.
+    quota : int, optional
+        Maximum size of the cache in bytes (default 20 GiB)
+    """
+    global diskCache
+    if directory is None:
+        directory = paths.cache / "accessors"
+    diskCache = DiskCache(directory, quota)
+    return diskCache
+
+def disableDiskCache():
+    """
+    Turn off caching of parsed data to disk. Existing cache files are left in place.
+    """
+    global diskCache
+    diskCache = None
+
+def enableMemoryCache(budget= 2 * 2**30):
+    """
+    Turn on caching of parsed data in memory for all Accessors.
+
+    Once enabled, :meth:`soundDENA.Accessor.access` returns a copy of a previous result
+    for the same filetype, file(s), and keyword arguments, unless any of the files' modification
+    times or sizes have changed. When the cached results add up to more than ``budget`` bytes
+    (measured with pandas' ``memory_usage``), the least-recently-used ones are dropped.
+
+    Parameters
+    ----------
+    budget : int, optional
+        Maximum memory used by cached results, in bytes (default 2 GiB)
+    """
+    global memoryCache
+    memoryCache = MemoryCache(budget)
+    return memoryCache
+
+def disableMemoryCache():
+    """
+    Turn off caching of parsed data in memory, and free any cached results.
+    """
+    global memoryCache
+    memoryCache = None
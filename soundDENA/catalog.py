@@ -0,0 +1,262 @@
+from . import paths
+
+import pathlib
+import sqlite3
+import threading
+import fnmatch
+import time
+import os
+
+"""
+Catalog - an inventory of the files in each site's data directory
+
+Finding files by globbing means listing and stat-ing every file in a directory, every time.
+On a network share or slow external drive, those calls dominate short queries. Instead, the
+catalog keeps a SQLite database (in :attr:`soundDENA.paths.cache`) of every file it has seen
+in each directory, with its size, modification time, and (for NVSPL files) the site, date, and hour
+parsed from its name.
+
+A directory's listing is reused as long as the directory's own modification time is unchanged,
+so checking a directory costs one stat call instead of one per file. (Adding, removing, or renaming
+a file updates the modification time of its directory.)
+"""
+
+# Directory modification times this recent (in seconds) aren't trusted, since more files could be
+# added within the same tick of the filesystem's timestamp resolution (2 sec on FAT drives).
+_settleTime = 2
+
+class Catalog:
+    """
+    A SQLite-backed index of directory listings.
+    """
+    _schema = """
+        CREATE TABLE IF NOT EXISTS dirs (
+            path TEXT PRIMARY KEY,
+            mtime INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS files (
+            dir TEXT NOT NULL,
+            name TEXT NOT NULL,
+            size INTEGER,
+            mtime INTEGER,
+            unit TEXT,
+            site TEXT,
+            date TEXT,
+            hour INTEGER,
+            PRIMARY KEY (dir, name)
+        );
+    """
+
+    def __init__(self, path):
+        """
+        Parameters
+        ----------
+        path : str or pathlib.Path
+            Location of the SQLite database file. Created if it doesn't exist.
+        """
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents= True, exist_ok= True)
+        self._connection = sqlite3.connect(str(self.path), check_same_thread= False, timeout= 30)
+        self._connection.executescript(self._schema)
+        self._lock = threading.Lock()
+
+    def listdir(self, directory):
+        """
+        Return a list of (name, size, mtime) tuples for the entries in a directory,
+        rescanning the directory only if it has changed since it was last cataloged.
+
+        Returns an empty list if the directory doesn't exist.
+        """
+        directory = str(directory)
+        try:
+            dirModified = os.stat(directory).st_mtime_ns
+        except OSError:
+            self._forget(directory)
+            return []
+
+        with self._lock:
+            row = self._connection.execute("SELECT mtime FROM dirs WHERE path = ?", (directory,)).fetchone()
+        if row is None or row[0] != dirModified:
+            return self._scan(directory, dirModified)
+
+        with self._lock:
+            return self._connection.execute("SELECT name, size, mtime FROM files WHERE dir = ? ORDER BY name", (directory,)).fetchall()
+
+    def _scan(self, directory, dirModified):
+        rows = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    # On Windows, scandir gets stat results for free as part of the listing
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        # i.e. a broken symlink, or a file removed since the listing; skip just this entry
+                        continue
+                    try:
+                        unit, site, hourStart = paths.splitNvsplFilename(entry.name)
+                        date, hour = hourStart.date().isoformat(), hourStart.hour
+                    except ValueError:
+                        unit = site = date = hour = None
+                    rows.append( (directory, entry.name, stat.st_size, stat.st_mtime_ns, unit, site, date, hour) )
+        except OSError:
+            self._forget(directory)
+            return []
+
+        if time.time() - dirModified / 1e9 < _settleTime:
+            # Too recent to trust; make sure it's rescanned next time
+            dirModified = None
+
+        try:
+            with self._lock, self._connection:
+                self._connection.execute("DELETE FROM files WHERE dir = ?", (directory,))
+                self._connection.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                self._connection.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?)", (directory, dirModified))
+        except sqlite3.OperationalError:
+            # i.e. database locked by another process for too long; the listing is still valid
+            pass
+
+        return sorted( (name, size, mtime) for _, name, size, mtime, *_ in rows )
+
+    def _forget(self, directory):
+        try:
+            with self._lock, self._connection:
+                self._connection.execute("DELETE FROM files WHERE dir = ?", (directory,))
+                self._connection.execute("DELETE FROM dirs WHERE path = ?", (directory,))
+        except sqlite3.OperationalError:
+            pass
+
+    def glob(self, directory, pattern):
+        """
+        Return a sorted list of pathlib.Paths to entries in ``directory`` whose names match ``pattern``
+        (a shell-style wildcard pattern, as used by ``glob``).
+        """
+        directory = pathlib.Path(directory)
+        return [ directory / name for name, _, _ in self.listdir(directory) if _fnmatch(name, pattern) ]
+
+    def exists(self, path):
+        """
+        Whether a file or directory exists, according to its parent directory's listing.
+        """
+        path = pathlib.Path(path)
+        # Match the filesystem's case sensitivity (i.e. case-insensitive on Windows), like os.path.exists
+        target = os.path.normcase(path.name)
+        return any( os.path.normcase(name) == target for name, _, _ in self.listdir(path.parent) )
+
+    def stat(self, path):
+        """
+        Return (mtime in nanoseconds, size) of a file, as of when its directory was last scanned.
+
+        Raises FileNotFoundError if the file isn't in the catalog.
+        """
+        path = pathlib.Path(path)
+        for name, size, mtime in self.listdir(path.parent):
+            if name == path.name:
+                return mtime, size
+        raise FileNotFoundError("{} does not exist.".format(path))
+
+    def index(self, dataDir):
+        """
+        Catalog every directory under a site's :ref:`data directory <dataDir>`.
+        """
+        for directory, _, _ in os.walk(str(dataDir)):
+            self.listdir(directory)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def _fnmatch(name, pattern):
+    # glob treats names starting with "." as hidden unless the pattern does too
+    if name.startswith(".") and not pattern.startswith("."):
+        return False
+    return fnmatch.fnmatch(name, pattern)
+
+
+## The catalog used for finding files. Set `enabled` to False to always use the filesystem directly.
+enabled = True
+_catalog = None
+_catalogPid = None
+_catalogLock = threading.Lock()
+
+def getCatalog():
+    """
+    Return the shared Catalog (stored in :attr:`soundDENA.paths.cache`), opening it if necessary.
+    Returns None if the catalog is disabled or can't be opened.
+    """
+    global _catalog, _catalogPid, enabled
+    if not enabled:
+        return None
+    with _catalogLock:
+        # SQLite connections can't be shared with forked worker processes; each opens its own
+        if _catalog is None or _catalogPid != os.getpid():
+            try:
+                _catalog = Catalog(paths.cache / "catalog.sqlite")
+                _catalogPid = os.getpid()
+            except (OSError, sqlite3.Error):
+                enabled = False
+                return None
+        return _catalog
+
+def glob(directory, pattern):
+    """
+    Return a sorted list of pathlib.Paths to the entries in ``directory`` matching ``pattern``,
+    using the catalog if possible.
+    """
+    catalog = getCatalog()
+    if catalog is None:
+        return sorted( pathlib.Path(directory).glob(pattern) )
+    return catalog.glob(directory, pattern)
+
+def exists(path):
+    """
+    Whether the file at ``path`` exists, using the catalog if possible.
+    """
+    catalog = getCatalog()
+    if catalog is None:
+        return pathlib.Path(path).exists()
+    return catalog.exists(path)
+
+def statFiles(filepaths):
+    """
+    Return a list of (mtime in nanoseconds, size) for each path, using one catalog listing
+    per directory rather than one stat call per file.
+
+    Raises FileNotFoundError if any file doesn't exist.
+    """
+    catalog = getCatalog()
+    if catalog is None:
+        stats = ( os.stat(str(path)) for path in filepaths )
+        return [ (stat.st_mtime_ns, stat.st_size) for stat in stats ]
+
+    listings = {}
+    result = []
+    for path in filepaths:
+        path = pathlib.Path(path)
+        directory = str(path.parent)
+        if directory not in listings:
+            listings[directory] = { name: (mtime, size) for name, size, mtime in catalog.listdir(directory) }
+        try:
+            result.append( listings[directory][path.name] )
+        except KeyError:
+            raise FileNotFoundError("{} does not exist.".format(path))
+    return result
+
+def indexSites(sites, quiet= True):
+    """
+    Catalog every file in the :ref:`data directories <dataDir>` of the given sites ahead of time.
+
+    Parameters
+    ----------
+    sites : iterable
+        :ref:`siteID` strings, or a pandas structure indexed by :ref:`siteID`
+    quiet : boolean, optional
+        Whether to not print progress
+    """
+    catalog = getCatalog()
+    if catalog is None:
+        return
+    for dataDir, unit, site, year in paths.dataDirs(sites, quiet= quiet):
+        catalog.index(dataDir)
+        if not quiet: print("Cataloged {}".format(dataDir))
@@ -0,0 +1,522 @@
+from . import accessors
+from . import sketch
+from . import timeabove
+from . import events
+from . import eventrates
+
+import numpy as np
+import pandas as pd
+import pathlib
+
+"""
+Compute metrics tables (as in AMT's METRICS files) directly from NVSPL and SRCID data
+
+``soundDENA.computedmetrics`` is an Accessor just like ``soundDENA.metrics``, and returns the same
+named-tuple structure, but builds each table from the site's NVSPL and SRCID files rather than reading
+a METRICS file. It works for any site-year with NVSPL, whether or not AMT was ever run on it::
+
+    for metrics, unit, site, year in soundDENA.computedmetrics(sites, siteWorkers= 8, siteProcesses= True):
+        print(metrics.ambient.data.loc["All", "dBA", "Day", "L050"])
+
+Each site's NVSPL is read once, in one-day chunks, into per-hour level histograms (see
+:mod:`soundDENA.sketch`): one of all samples, and one of just noise-free samples (outside every SRCID event).
+Every level metric is then computed from the histograms with vectorized operations, and every SRCID metric
+from sorted arrays of event intervals.
+
+Metrics are computed as follows (levels are per hour, per day or night, or per season, as noted):
+
++ ``hourlyMedian``: for each hour of the day, the median across days of Lmin, L099, L090, Lnat, L050, L010, L001, Lmax, and Leq
++ ``frequency``: for each band, the median across days (or nights) of L090, Lnat, L050, L010, and Leq
++ ``ambient``: L090, Lnat, L050, L010, and Leq of all day or night samples in the season
++ ``percentTimeAbove``: percent of day or night samples above each threshold (see :mod:`soundDENA.timeabove`)
++ ``contour``: for each hour of the day and band, the median across days of L090, Lnat, L050, and L005
++ ``eventAudibilityPct``: for each hour of the day and SRCID ``srcID``, the percent of time audible
++ ``categoricalEventAudibility``: the same, by category of source (the whole-number part of ``srcID``)
++ ``percentTimeAudible``: the percent of day or night time audible, by category of source and in total
++ ``noiseFreeInterval``: for each hour of the day, percentiles of the lengths of gaps between events (see :mod:`soundDENA.eventrates`)
++ ``eventAvg``: for each hour of the day and ``srcID``, the average number of events per day (``counts``) and their average length (``lengths``)
+
+Lnat (natural ambient) is the L50 of noise-free samples. Metrics that aren't computed are None.
+"""
+
+## The metrics file version whose structure computed metrics follow
+metricsVersion = "1.35"
+
+## Default settings
+# { tableType in metrics files: NVSPL column } for broadband levels. AMT's "dBT" is the flat (unweighted) level.
+defaultWeightings = { "dBA": "dbA", "dBT": "dbF" }
+# Hours of the "Day": from the first hour up to but not including the second
+defaultDay = (7, 19)
+# Thresholds in dB for percentTimeAbove
+defaultThresholds = (35, 45, 52, 60)
+
+# { row label: percent exceeded } of the exceedance levels in each table
+hourlyLevels = { "Lmin": 100, "L099": 99, "L090": 90, "L050": 50, "L010": 10, "L001": 1, "Lmax": 0 }
+periodLevels = { "L090": 90, "L050": 50, "L010": 10 }
+contourLevels = { "l90": 90, "l50": 50, "l05": 5 }
+
+def computedMetricsPaths(dataDir, unit, site, year, **kwargs):
+    # **kwargs used to handle being given keyword args for computedMetrics() and nvsplPaths() as well
+    """
+    Return the sources needed to compute metrics for a site: its NVSPL (as from :func:`soundDENA.accessors.nvsplPaths`)
+    and the path to its SRCID file (or None if it has none).
+
+    This function follows the signature for ``pathToData()`` as defined in :meth:`soundDENA.Accessor.__init__`.
+    """
+    nvsplSource = accessors.nvsplPaths(dataDir, unit, site, year, **kwargs)
+    try:
+        srcidSource = accessors.srcidPath(dataDir, unit, site, year)
+    except IOError:
+        srcidSource = None
+    return nvsplSource, srcidSource
+
+def computedMetrics(sources, weightings= None, seasons= None, day= defaultDay, thresholds= defaultThresholds, **kwargs):
+    # **kwargs used to handle being given keyword args for nvsplPaths() as well
+    """
+    Compute the tables of a METRICS file from a site's NVSPL and SRCID data.
+
+    Parameters
+    ----------
+    sources : tuple
+        NVSPL source and SRCID path, as returned by :func:`computedMetricsPaths`
+
+    Keyword Args
+    ------------
+    weightings : dict of {str: str}, default :data:`defaultWeightings`
+        Which NVSPL column to use for each broadband table type, i.e. ``{"dBA": "dbA", "dBT": "dbF"}``
+    seasons : dict of {str: (datetime-like, datetime-like)}, optional
+        Name and (inclusive) date range of each season, i.e. ``{"Summer": ("2015-06-01", "2015-08-31")}``.
+        By default, all data is one season called "All".
+    day : (int, int), default (7, 19)
+        Hours considered "Day": from the first hour up to but not including the second
+    thresholds : iterable of number
+        Thresholds in dB for ``percentTimeAbove``
+
+    Returns
+    -------
+    Metrics
+        The same named tuple as ``soundDENA.metrics`` returns for a version 1.35 METRICS file
+    """
+    nvsplSource, srcidPath = sources
+    weightings = weightings if weightings is not None else defaultWeightings
+
+    events = None
+    if srcidPath is not None:
+        events = eventIntervals( accessors.srcid(srcidPath) )
+
+    bands = list(accessors.nvsplBands) + [ column for column in weightings.values() if column not in accessors.nvsplBands ]
+    allLevels, quietLevels = levelHistograms(nvsplSource, events, bands)
+
+    header, tables, ns = metricsTables(allLevels, quietLevels, events, weightings, seasons, day, thresholds)
+    return accessors.metricsReaders[metricsVersion].assemble(header, tables, ns)
+
+
+## Event intervals
+
+def eventIntervals(data):
+    """
+    Arrays of the start, end, and ``srcID`` of each event in SRCID data, sorted by start.
+    Rows without a ``srcID`` or length (i.e. noise-free days) are skipped.
+
+    Parameters
+    ----------
+    data : DataFrame
+        As returned by ``soundDENA.srcid``
+
+    Returns
+    -------
+    starts, ends : int64 ndarray
+        Nanoseconds since the epoch (like ``numpy.datetime64[ns]``). Events cover ``[start, end)``.
+    srcIDs : float64 ndarray
+    """
+    valid = data.srcID.notnull().values & data.len.notnull().values
+    starts = data.index.values[valid].astype("datetime64[ns]").view(np.int64)
+    ends = starts + data.len.values[valid].astype("timedelta64[ns]").view(np.int64)
+    srcIDs = data.srcID.values[valid].astype(np.float64)
+    order = np.argsort(starts, kind= "mergesort")
+    return starts[order], ends[order], srcIDs[order]
+
+def unionIntervals(starts, ends):
+    """
+    Merge overlapping intervals (given sorted by start) into sorted, disjoint intervals.
+    """
+    if len(starts) == 0:
+        return starts, ends
+    # Running maximum of ends: an interval starts a new run if it begins after every earlier interval has ended
+    reach = np.maximum.accumulate(ends)
+    newRun = np.ones(len(starts), dtype= bool)
+    newRun[1:] = starts[1:] > reach[:-1]
+    runStarts = np.flatnonzero(newRun)
+    runEnds = np.concatenate([ runStarts[1:], [len(starts)] ]) - 1
+    return starts[runStarts], reach[runEnds]
+
+def coveredTime(starts, ends, lo, hi):
+    """
+    Total length of disjoint, sorted intervals that falls within each window ``[lo, hi)``.
+    """
+    cumulative = np.concatenate([ [0], np.cumsum(ends - starts) ])
+
+    def coveredBefore(t):
+        # Time covered by intervals before each time t
+        k = np.searchsorted(starts, t, side= "right")
+        partial = np.where(k > 0, np.minimum(t, ends[np.maximum(k - 1, 0)]) - starts[np.maximum(k - 1, 0)], 0)
+        return cumulative[np.maximum(k - 1, 0)] + np.maximum(partial, 0)
+
+    if len(starts) == 0:
+        return np.zeros(len(lo), dtype= np.int64)
+    return coveredBefore(np.asarray(hi)) - coveredBefore(np.asarray(lo))
+
+def isCovered(starts, ends, times):
+    """
+    Whether each time falls within any of the disjoint, sorted intervals.
+    """
+    if len(starts) == 0:
+        return np.zeros(len(times), dtype= bool)
+    k = np.searchsorted(starts, times, side= "right") - 1
+    return (k >= 0) & (times < ends[np.maximum(k, 0)])
+
+
+## Levels
+
+def levelHistograms(nvsplSource, events, bands):
+    """
+    Hourly histograms of every sample, and of just the noise-free samples (outside every event), of a site's NVSPL.
+
+    Parameters
+    ----------
+    nvsplSource
+        As returned by :func:`soundDENA.accessors.nvsplPaths`
+    events : tuple of ndarray, or None
+        As returned by :func:`eventIntervals`. If None, noise-free histograms are None.
+    bands : list of str
+        Which NVSPL columns to count
+
+    Returns
+    -------
+    allLevels, quietLevels : soundDENA.sketch.LevelHistograms
+    """
+    if events is not None:
+        eventStarts, eventEnds = unionIntervals(events[0], events[1])
+
+    allLevels = []
+    quietLevels = []
+    for day in accessors.nvsplStream(nvsplSource, chunk= "1d"):
+        day = day[[ band for band in bands if band in day.columns ]]
+        allLevels.append( sketch.LevelHistograms.fromFrame(day, "", bands) )
+        if events is not None:
+            noisy = isCovered(eventStarts, eventEnds, day.index.values.astype("datetime64[ns]").view(np.int64))
+            quietLevels.append( sketch.LevelHistograms.fromFrame(day[~noisy], "", bands) )
+
+    merged = lambda histograms: sketch.LevelHistograms.merge(*histograms) if len(histograms) > 0 else sketch.LevelHistograms.empty(bands)
+    return merged(allLevels), (merged(quietLevels) if events is not None else None)
+
+
+## Tables
+
+def metricsTables(allLevels, quietLevels, events, weightings, seasons, day, thresholds):
+    """
+    Compute every table, in the form taken by :meth:`soundDENA.accessors.metricsReader.assemble`.
+
+    Returns
+    -------
+    header : dict
+    tables : dict of { metricName: {season: {tableType: DataFrame}} }
+    ns : dict of { metricName: {season: {tableType: Timedelta}} }
+    """
+    seasonNames = list(seasons.keys()) if seasons is not None else ["All"]
+    tables = {}
+    ns = {}
+    def add(metricName, season, tableType, table, n):
+        tables.setdefault(metricName, {}).setdefault(season, {})[tableType] = table
+        ns.setdefault(metricName, {}).setdefault(season, {})[tableType] = n
+
+    ## Per-hour statistics, used by most tables
+    hours = pd.DatetimeIndex(allLevels.groups.hour)
+    hourly = allLevels.exceedance(sorted(set(hourlyLevels.values()) | set(periodLevels.values()) | set(contourLevels.values())), by= "hour")
+    hourlyLeq = allLevels.leq(by= "hour")
+    hourlyLnat = _lnat(quietLevels, "hour", hourly.index, allLevels.bands)
+
+    seasonOfHour = timeabove._seasonCodes(hours, seasons)
+    isDay = (hours.hour >= day[0]) & (hours.hour < day[1])
+    # Nights are labeled by the date they start on
+    periodDates = np.where(isDay, hours.normalize(), (hours - pd.Timedelta(hours= day[1])).normalize())
+    periodDates = pd.DatetimeIndex(periodDates)
+
+    for s, season in enumerate(seasonNames):
+        inSeason = seasonOfHour == s
+        seasonHours = hours[inSeason]
+        nDays = pd.Timedelta(days= seasonHours.normalize().nunique())
+
+        ## hourlyMedian
+        for tableType, column in weightings.items():
+            stats = pd.DataFrame({ name: hourly.loc[inSeason, (column, "L{:g}".format(percent))].values for name, percent in hourlyLevels.items() }, index= seasonHours)
+            stats["Lnat"] = hourlyLnat.loc[inSeason, column].values
+            stats["Leq"] = hourlyLeq.loc[inSeason, column].values
+            table = stats.groupby(seasonHours.hour).median().T.reindex(["Lmin", "L099", "L090", "Lnat", "L050", "L010", "L001", "Lmax", "Leq"])
+            add("hourlyMedian", season, tableType, _hourColumns(table), nDays)
+
+        ## contour
+        for tableType, percent in list(contourLevels.items()) + [("lnat", None)]:
+            if percent is None:
+                levels = hourlyLnat.loc[inSeason, allLevels.bands.intersection(accessors.nvsplBands)]
+            else:
+                levels = hourly.loc[inSeason, [ (band, "L{:g}".format(percent)) for band in accessors.nvsplBands if band in allLevels.bands ]]
+                levels.columns = levels.columns.get_level_values(0)
+            table = levels.groupby(seasonHours.hour).median()
+            table.columns = _bandLabels(table.columns)
+            table.index.name = "hour"
+            add("contour", season, tableType, table, nDays)
+
+        ## frequency (per day or night, then median across them) and ambient (all day or night samples at once)
+        for period, inPeriod in (("Day", isDay), ("Night", ~isDay)):
+            selected = inSeason & inPeriod
+            periodLabels = np.where(selected, periodDates.values, np.datetime64("NaT"))
+            periodStats = _periodStats(allLevels, quietLevels, periodLabels)
+            table = periodStats.median().unstack(level= 0).reindex(["L090", "Lnat", "L050", "L010", "Leq"])
+            table = table[[ band for band in accessors.nvsplBands if band in table.columns ]]
+            table.columns = _bandLabels(table.columns)
+            table.index.name = "percentile"
+            add("frequency", season, period.lower(), table, pd.Timedelta(days= periodStats.shape[0]))
+
+            wholePeriod = np.where(selected, period, None)
+            ambient = _periodStats(allLevels, quietLevels, wholePeriod).iloc[0] if selected.any() else None
+            for tableType, column in weightings.items():
+                row = ambient.loc[column] if ambient is not None else pd.Series(np.nan, index= ["L090", "Lnat", "L050", "L010", "Leq"])
+                tables.setdefault("ambient", {}).setdefault(season, {}).setdefault(tableType, {})[period] = row
+                ns.setdefault("ambient", {}).setdefault(season, {}).setdefault(tableType, pd.Timedelta(0))
+                ns["ambient"][season][tableType] += pd.Timedelta(hours= int(selected.sum()))
+
+        for tableType in weightings:
+            table = pd.DataFrame(tables["ambient"][season][tableType]).T.reindex(columns= ["L090", "Lnat", "L050", "L010", "Leq"])
+            table.columns.name = "percentile"
+            tables["ambient"][season][tableType] = table
+
+    ## percentTimeAbove
+    aboveTables, aboveNs = timeabove.percentTimeAboveTables(
+        allLevels, thresholds, bands= list(weightings.values()), day= day, seasons= seasons,
+        tableTypes= { column: tableType for tableType, column in weightings.items() }
+    )
+    for season, types in aboveTables.items():
+        for tableType, table in types.items():
+            # "overall" is added when the tables are assembled, as it is for metrics files
+            add("percentTimeAbove", season, tableType, table.drop("overall"), aboveNs[season][tableType])
+
+    ## Audibility of SRCID events
+    if events is not None:
+        for season, (metricName, table, n) in _audibilityTables(events, allLevels, seasonNames, seasonOfHour, isDay):
+            add(metricName, season, None, table, n)
+
+    ## Noise-free intervals and event rates
+    if events is not None:
+        for season, (metricName, tableType, table, n) in _eventRateTables(events, allLevels, seasons, seasonNames, seasonOfHour):
+            add(metricName, season, tableType, table, n)
+
+    header = {
+        "day": "{:02d}:00:00 to {:02d}:59:59".format(day[0], day[1] - 1),
+        "night": "{:02d}:00:00 to {:02d}:59:59".format(day[1], (day[0] - 1) % 24),
+        "source": "computed from NVSPL and SRCID by soundDENA"
+    }
+    return header, tables, ns
+
+def _lnat(quietLevels, by, index, bands):
+    """
+    Lnat (L50 of noise-free samples) of each band, by the same labels as ``index``. NaN without SRCID.
+    """
+    if quietLevels is None:
+        return pd.DataFrame(np.nan, index= index, columns= bands)
+    lnat = quietLevels.exceedance([50], by= by)
+    lnat.columns = lnat.columns.get_level_values(0)
+    return lnat.reindex(index)
+
+def _periodStats(allLevels, quietLevels, labels):
+    """
+    L090, Lnat, L050, L010, and Leq of each band, for groups of hourly histograms labeled by ``labels``
+    (one per hour; None or NaT to leave out).
+
+    Returns a DataFrame with one row per label, and columns of (band, statistic).
+    """
+    labels = pd.Series(labels)
+    levels = allLevels.exceedance(list(periodLevels.values()), by= labels.values)
+    levels.columns = pd.MultiIndex.from_tuples([ (band, "L{:03d}".format(int(percent[1:]))) for band, percent in levels.columns ])
+    leq = allLevels.leq(by= labels.values)
+    leq.columns = pd.MultiIndex.from_product([leq.columns, ["Leq"]])
+    if quietLevels is not None:
+        quietLabels = pd.Series(labels.values, index= pd.DatetimeIndex(allLevels.groups.hour)).reindex(pd.DatetimeIndex(quietLevels.groups.hour))
+        lnat = quietLevels.exceedance([50], by= quietLabels.values).reindex(levels.index)
+    else:
+        lnat = pd.DataFrame(np.nan, index= levels.index, columns= pd.MultiIndex.from_product([allLevels.bands, ["L50"]]))
+    lnat.columns = pd.MultiIndex.from_product([lnat.columns.get_level_values(0), ["Lnat"]])
+    return pd.concat([levels, lnat, leq], axis= 1).sort_index(axis= 1)
+
+def _audibilityTables(events, allLevels, seasonNames, seasonOfHour, isDay):
+    """
+    eventAudibilityPct, categoricalEventAudibility, and percentTimeAudible for each season.
+
+    Audible time is the union of all events of a source (or category), and is only counted within hours with NVSPL data.
+    Percents are of the number of NVSPL samples (seconds) in the same hours.
+    """
+    starts, ends, srcIDs = events
+    hourStarts = pd.DatetimeIndex(allLevels.groups.hour).values.astype("datetime64[ns]").view(np.int64)
+    hourEnds = hourStarts + pd.Timedelta(hours= 1).value
+    hourOfDay = pd.DatetimeIndex(allLevels.groups.hour).hour
+    # Seconds of data in each hour, by the broadband level with the most samples
+    seconds = allLevels.total(by= np.arange(len(allLevels.groups))).max(axis= 1).values.astype(np.float64)
+
+    def audibleSeconds(mask):
+        # Seconds audible in each hour of data, for the union of the events selected by mask
+        unionStarts, unionEnds = unionIntervals(starts[mask], ends[mask])
+        return coveredTime(unionStarts, unionEnds, hourStarts, hourEnds) / 1e9
+
+    bySource = { srcID: audibleSeconds(srcIDs == srcID) for srcID in np.unique(srcIDs) }
+    categories = np.floor(srcIDs).astype(np.int64)
+    byCategory = { category: audibleSeconds(categories == category) for category in np.unique(categories) }
+    total = audibleSeconds(np.ones(len(starts), dtype= bool))
+
+    for s, season in enumerate(seasonNames):
+        inSeason = seasonOfHour == s
+        n = pd.Timedelta(days= pd.DatetimeIndex(allLevels.groups.hour[inSeason]).normalize().nunique())
+
+        def byHourOfDay(audible, name):
+            table = pd.DataFrame({ key: audible[key][inSeason] for key in audible }, index= hourOfDay[inSeason]).groupby(level= 0).sum()
+            dataSeconds = pd.Series(seconds[inSeason], index= hourOfDay[inSeason]).groupby(level= 0).sum()
+            with np.errstate(divide= "ignore", invalid= "ignore"):
+                table = (100 * table.div(dataSeconds, axis= 0)).T
+            table.index.name = name
+            table.columns.name = "hour"
+            return table
+
+        yield season, ("eventAudibilityPct", byHourOfDay(bySource, "srcID"), n)
+        yield season, ("categoricalEventAudibility", byHourOfDay(byCategory, "category"), n)
+
+        rows = {}
+        for period, inPeriod in (("Day", isDay), ("Night", ~isDay)):
+            selected = inSeason & inPeriod
+            dataSeconds = seconds[selected].sum()
+            with np.errstate(divide= "ignore", invalid= "ignore"):
+                row = { category: 100 * audible[selected].sum() / dataSeconds for category, audible in byCategory.items() }
+                row["all"] = 100 * total[selected].sum() / dataSeconds
+            rows[period] = row
+        yield season, ("percentTimeAudible", pd.DataFrame(rows).T, n)
+
+def _eventRateTables(intervals, allLevels, seasons, seasonNames, seasonOfHour):
+    """
+    noiseFreeInterval and eventAvg for each season (see :mod:`soundDENA.eventrates`).
+
+    Only noise-free intervals wholly within hours with NVSPL data are counted, and event counts are averaged over the days with NVSPL data.
+    """
+    starts, ends, srcIDs = intervals
+    index = events.EventIndex([""], np.zeros(len(starts), dtype= np.int32), starts, ends, srcIDs)
+    hours = pd.DatetimeIndex(allLevels.groups.hour)
+    hourStarts = hours.values.astype("datetime64[ns]").view(np.int64)
+    coverage = { "": unionIntervals(hourStarts, hourStarts + pd.Timedelta(hours= 1).value) }
+    nDays = { season: hours[seasonOfHour == s].normalize().nunique() for s, season in enumerate(seasonNames) }
+
+    nfi = eventrates.noiseFreeInterval(index, seasons= seasons, coverage= coverage)
+    counts, lengths = eventrates.eventAverages(index, seasons= seasons, days= { ("", season): n for season, n in nDays.items() })
+    hourColumns = pd.Index(np.arange(24), name= "hour")
+    for season in seasonNames:
+        n = pd.Timedelta(days= nDays[season])
+        for metricName, tableType, table in (("noiseFreeInterval", None, nfi), ("eventAvg", "counts", counts), ("eventAvg", "lengths", lengths)):
+            try:
+                seasonTable = table.loc[("", season)]
+            except KeyError:
+                seasonTable = pd.DataFrame(columns= hourColumns, dtype= np.float64)
+            yield season, (metricName, tableType, seasonTable, n)
+
+def _hourColumns(table):
+    table.columns = table.columns.astype(int)
+    table.columns.name = "hour"
+    table.index.name = "percentile"
+    return table
+
+def _bandLabels(bands):
+    # Frequency bands are labeled like "12.5Hz" in metrics files
+    return pd.Index([ "{}Hz".format(band) for band in bands ])
+
+
+## Daily percent audible
+
+def computedDailyPA(path, groups= None, total= True, **kwargs):
+    """
+    Compute a DAILYPA (percent time audible) table from a site's SRCID file, in the same form that
+    ``soundDENA.dailypa`` reads from the files AMT exports. See :func:`dailyPercentAudible`.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        Path to the SRCID file
+
+    Keyword Args
+    ------------
+    groups, total
+        As for :func:`dailyPercentAudible`
+
+    Returns
+    -------
+    MultiIndexed DataFrame
+    """
+    return dailyPercentAudible(accessors.srcid(path), groups= groups, total= total)
+
+def dailyPercentAudible(data, groups= None, total= True):
+    """
+    Percent of each hour, and of each whole day, that each source (or group of sources) was audible.
+
+    For each group, its events are merged into disjoint intervals, and the time they cover within every
+    hour of every day is measured at once (see :func:`coveredTime`). Events that span hours or midnight
+    count toward each hour they cover.
+
+    Parameters
+    ----------
+    data : DataFrame
+        SRCID data, as returned by ``soundDENA.srcid``. Every date with a row (including noise-free days) gets rows in the result.
+    groups : dict, optional
+        ``{ label: srcIDs }`` of the sources to combine into each row, where ``srcIDs`` is a list of ``srcID`` numbers,
+        or a function that takes an array of ``srcID`` s and returns a boolean array of which to include,
+        i.e. ``{"jets": [1.1, 1.2], "aircraft": lambda srcID: np.floor(srcID) == 1}``.
+        By default, each ``srcID`` is its own row, labeled like "1.1".
+    total : boolean, default True
+        Whether to add a "Total_All" row of the time any source was audible. If so, no group can be labeled "Total_All".
+
+    Returns
+    -------
+    MultiIndexed DataFrame
+        Indexed by ``date`` (a string like "2013-06-29") and ``srcid`` (the group label), with the columns "00h" to "23h"
+        and "00-23h" (the whole day), in percent. Laid out the same as ``soundDENA.dailypa``.
+    """
+    starts, ends, srcIDs = eventIntervals(data)
+    if groups is None:
+        groups = { str(float(srcID)): [srcID] for srcID in np.unique(srcIDs) }
+    groups = dict(groups)
+    if total:
+        if "Total_All" in groups:
+            raise ValueError('"Total_All" is the label of the total row; use another label for that group, or total= False')
+        groups["Total_All"] = None
+
+    days = pd.DatetimeIndex(data.index[data.index.notnull()].normalize().unique()).sort_values()
+    dayStarts = days.values.astype("datetime64[ns]").view(np.int64)
+    hourLength = pd.Timedelta(hours= 1).value
+    hourStarts = ( dayStarts[:, np.newaxis] + np.arange(24) * hourLength ).ravel()
+
+    percents = np.empty((len(days), len(groups), 25))
+    for g, members in enumerate(groups.values()):
+        if members is None:
+            selected = np.ones(len(srcIDs), dtype= bool)
+        elif callable(members):
+            selected = np.asarray(members(srcIDs), dtype= bool)
+        else:
+            selected = np.isin(srcIDs, np.asarray(list(members), dtype= np.float64))
+        unionStarts, unionEnds = unionIntervals(starts[selected], ends[selected])
+        audible = coveredTime(unionStarts, unionEnds, hourStarts, hourStarts + hourLength).reshape(len(days), 24)
+        percents[:, g, :24] = 100 * audible / hourLength
+        percents[:, g, 24] = 100 * audible.sum(axis= 1) / (24 * hourLength)
+
+    index = pd.MultiIndex.from_product([days.strftime("%Y-%m-%d"), list(groups.keys())], names= ["date", "srcid"])
+    columns = [ "{:02d}h".format(hour) for hour in range(24) ] + ["00-23h"]
+    return pd.DataFrame(percents.reshape(-1, 25), index= index, columns= columns).sort_index()
+
+
+# { "filetype": (parserFunc, pathToData) }, added to soundDENA's Accessors alongside accessors.accessorExports
+computeExports = {
+    "computedmetrics": (computedMetrics, computedMetricsPaths),
+    "computeddailypa": (computedDailyPA, accessors.srcidPath)
+}
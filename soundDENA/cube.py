@@ -0,0 +1,329 @@
+import numpy as np
+import pandas as pd
+import warnings
+
+"""
+A lightweight N-dimensional labeled array, in place of pandas Panel and Panel4D
+
+A :class:`LabeledArray` is one contiguous ndarray of values, plus a pandas Index of labels for each axis.
+Labels are looked up through the Index's hash table, so selecting by label is just a position lookup
+followed by numpy indexing: selecting single labels or slices gives a view of the same memory, not a copy.
+Selections with two axes left come back as a DataFrame, with one axis as a Series, and with none as a scalar,
+so it behaves much like the Panels it replaces::
+
+    metrics.hourlyMedian.data.loc["Summer", "dBA"]              # DataFrame of one table
+    metrics.hourlyMedian.data.loc[:, :, "Leq", 0:12].mean(axis= "Season")
+
+Axes can be referred to by position, by name (i.e. "Season"), or by the Panel axis names
+("labels", "items", "major_axis", "minor_axis").
+"""
+
+# Names pandas Panels gave their axes, by number of dimensions
+panelAxisNames = {
+    3: ["items", "major_axis", "minor_axis"],
+    4: ["labels", "items", "major_axis", "minor_axis"]
+}
+
+class LabeledArray:
+    """
+    An N-dimensional array with a pandas Index of labels along each axis.
+
+    Attributes
+    ----------
+    values : ndarray
+    axes : list of pandas Index
+        Labels of each axis. Each Index's ``name`` is the name of the axis.
+    """
+    def __init__(self, values, axes, names= None):
+        """
+        Parameters
+        ----------
+        values : array-like
+        axes : list of array-like
+            Labels of each axis, one per dimension of ``values``
+        names : list of str, optional
+            Names of each axis. By default, the names of the ``axes`` (if they're pandas Indexes).
+        """
+        self.values = np.asarray(values)
+        if len(axes) != self.values.ndim:
+            raise ValueError("Got {} axes for an array of {} dimensions".format(len(axes), self.values.ndim))
+        self.axes = [ pd.Index(axis) for axis in axes ]
+        for i, (axis, length) in enumerate(zip(self.axes, self.values.shape)):
+            if len(axis) != length:
+                raise ValueError("Axis {} has {} labels, but the array has length {} along it".format(i, len(axis), length))
+        if names is not None:
+            self.axes = [ axis.rename(name) for axis, name in zip(self.axes, names) ]
+
+    @classmethod
+    def fromFrames(cls, frames, names= None):
+        """
+        Stack (possibly nested) dicts of DataFrames into one array, like ``pd.Panel(frames)`` or ``pd.Panel4D(frames)``.
+
+        The outer axes are the dict keys, in order; the last two are the rows and columns of the DataFrames.
+        Frames with different rows or columns are aligned on all of them (in order of first appearance), with NaN where they're missing.
+
+        Parameters
+        ----------
+        frames : dict of DataFrame, or dict of dict of DataFrame, ...
+        names : list of str, optional
+            Names of the outer axes. The row and column axes keep the names of the DataFrames' index and columns.
+
+        Returns
+        -------
+        LabeledArray
+        """
+        paths = []
+        def flatten(node, path):
+            if isinstance(node, dict):
+                for key, child in node.items():
+                    flatten(child, path + (key,))
+            else:
+                paths.append( (path, node) )
+        flatten(frames, ())
+
+        depth = len(paths[0][0]) if len(paths) > 0 else 1
+        outerAxes = [ _orderedUnion([ pd.Index([path[level]], dtype= object) for path, frame in paths ]) for level in range(depth) ]
+        rows = _orderedUnion([ frame.index for path, frame in paths ])
+        columns = _orderedUnion([ frame.columns for path, frame in paths ])
+
+        values = np.full([ len(axis) for axis in outerAxes ] + [len(rows), len(columns)], np.nan)
+        for path, frame in paths:
+            position = tuple( axis.get_loc(key) for axis, key in zip(outerAxes, path) )
+            if frame.index.equals(rows) and frame.columns.equals(columns):
+                values[position] = frame.values
+            else:
+                values[position] = frame.reindex(index= rows, columns= columns).values
+
+        if names is not None:
+            outerAxes = [ axis.rename(name) for axis, name in zip(outerAxes, names) ]
+        return cls(values, outerAxes + [rows, columns])
+
+    ## Shape
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def ndim(self):
+        return self.values.ndim
+
+    @property
+    def names(self):
+        return [ axis.name for axis in self.axes ]
+
+    def __len__(self):
+        return len(self.axes[0])
+
+    def __iter__(self):
+        return iter(self.axes[0])
+
+    def keys(self):
+        return self.axes[0]
+
+    def axisNumber(self, axis):
+        """
+        Position of an axis given by position, name, or Panel axis name ("items", "major_axis", ...)
+        """
+        if isinstance(axis, (int, np.integer)):
+            return int(axis) % self.ndim
+        if axis in self.names:
+            return self.names.index(axis)
+        aliases = panelAxisNames.get(self.ndim, [])
+        if axis in aliases:
+            return aliases.index(axis)
+        raise KeyError("No axis {!r}".format(axis))
+
+    def __getattr__(self, name):
+        # Panel-style access to the labels of an axis (i.e. data.items), or to a label of the first axis (i.e. data.Summer)
+        if name.startswith("_") or name in ("values", "axes"):
+            raise AttributeError(name)
+        aliases = panelAxisNames.get(self.ndim, [])
+        if name in aliases:
+            return self.axes[aliases.index(name)]
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError("{} has no attribute or label {!r}".format(type(self).__name__, name))
+
+    ## Selection
+
+    @property
+    def loc(self):
+        """
+        Select by label, i.e. ``data.loc["Summer", "dBA", :, 0:12]``. Each key can be a single label (which drops the axis),
+        a slice of labels (inclusive of both ends), a list of labels, or a boolean array. Labels that match
+        several positions, like partial date strings (i.e. ``"2013-07"``) on a date axis, keep the axis.
+        """
+        return _Indexer(self, byLabel= True)
+
+    @property
+    def iloc(self):
+        """
+        Select by position, i.e. ``data.iloc[0, :, 2]``
+        """
+        return _Indexer(self, byLabel= False)
+
+    def __getitem__(self, key):
+        # Like a Panel, a single key selects from the first axis
+        return self.loc[key]
+
+    def _select(self, keys, byLabel):
+        if not isinstance(keys, tuple):
+            keys = (keys,)
+        if len(keys) > self.ndim:
+            raise IndexError("Too many keys ({}) for {} dimensions".format(len(keys), self.ndim))
+        keys = keys + (slice(None),) * (self.ndim - len(keys))
+
+        # Basic indexing (single positions and slices) first, which gives a view;
+        # then take lists of positions along their axes, which has to copy
+        basic = []
+        taken = []
+        axes = []
+        for axis, key in zip(self.axes, keys):
+            position = _position(axis, key, byLabel)
+            if isinstance(position, slice):
+                basic.append(position)
+                axes.append(axis[position])
+            elif np.ndim(position) == 0:
+                basic.append(int(position))
+            else:
+                basic.append(slice(None))
+                taken.append( (len(axes), position) )
+                axes.append(axis[position])
+
+        values = self.values[tuple(basic)]
+        for axisNumber, positions in taken:
+            values = np.take(values, positions, axis= axisNumber)
+        return _wrap(values, axes)
+
+    def transpose(self, *axes):
+        """
+        Reorder the axes (given by position or name). Returns a view.
+        """
+        order = [ self.axisNumber(axis) for axis in axes ]
+        return LabeledArray(self.values.transpose(order), [ self.axes[i] for i in order ])
+
+    def append(self, axis, label, values):
+        """
+        A new LabeledArray with one more label at the end of an axis, holding ``values``
+        (an array of the shape of the other axes, or anything that broadcasts to it).
+        """
+        axis = self.axisNumber(axis)
+        values = np.expand_dims(np.broadcast_to(values, self.shape[:axis] + self.shape[axis + 1:]), axis)
+        newAxis = self.axes[axis].append(pd.Index([label], dtype= self.axes[axis].dtype if len(self.axes[axis]) > 0 else object))
+        axes = list(self.axes)
+        axes[axis] = newAxis.rename(self.axes[axis].name)
+        return LabeledArray(np.concatenate([self.values, values], axis= axis), axes)
+
+    def copy(self):
+        return LabeledArray(self.values.copy(), self.axes)
+
+    ## Reductions
+
+    def reduce(self, func, axis= 0):
+        """
+        Apply a numpy reduction (like ``np.nanmean``) along an axis, or a list of axes
+        """
+        axisNumbers = [ self.axisNumber(a) for a in (axis if isinstance(axis, (list, tuple)) else [axis]) ]
+        with warnings.catch_warnings():
+            # All-NaN slices reduce to NaN, as in pandas
+            warnings.simplefilter("ignore", RuntimeWarning)
+            values = func(self.values, axis= tuple(axisNumbers))
+        return _wrap(values, [ axis for i, axis in enumerate(self.axes) if i not in axisNumbers ])
+
+    def mean(self, axis= 0):
+        return self.reduce(np.nanmean, axis)
+
+    def median(self, axis= 0):
+        return self.reduce(np.nanmedian, axis)
+
+    def sum(self, axis= 0):
+        return self.reduce(np.nansum, axis)
+
+    def min(self, axis= 0):
+        return self.reduce(np.nanmin, axis)
+
+    def max(self, axis= 0):
+        return self.reduce(np.nanmax, axis)
+
+    def std(self, axis= 0):
+        return self.reduce(lambda values, axis: np.nanstd(values, axis= axis, ddof= 1), axis)
+
+    ## Conversion
+
+    def toSeries(self):
+        """
+        All the values as a Series, with a MultiIndex of every combination of labels
+        """
+        return pd.Series(self.values.ravel(), index= pd.MultiIndex.from_product(self.axes))
+
+    def __array__(self, dtype= None):
+        return self.values if dtype is None else self.values.astype(dtype)
+
+    def __repr__(self):
+        lines = [ "<{}: {}>".format(type(self).__name__, " x ".join(str(n) for n in self.shape)) ]
+        for i, axis in enumerate(self.axes):
+            name = axis.name if axis.name is not None else "axis {}".format(i)
+            labels = list(axis[:3]) + (["..."] if len(axis) > 4 else []) + (list(axis[-1:]) if len(axis) > 3 else [])
+            lines.append( "{}: {}".format(name, ", ".join(map(str, labels))) )
+        return "\n".join(lines)
+
+
+class _Indexer:
+    def __init__(self, array, byLabel):
+        self.array = array
+        self.byLabel = byLabel
+
+    def __getitem__(self, keys):
+        return self.array._select(keys, self.byLabel)
+
+
+def _position(axis, key, byLabel):
+    """
+    Turn a key for one axis into an int, a slice, or an array of positions
+    """
+    if isinstance(key, slice):
+        if not byLabel or (key.start is None and key.stop is None):
+            return key
+        return axis.slice_indexer(key.start, key.stop, key.step)
+    if np.ndim(key) == 0 and not isinstance(key, (list, pd.Index)):
+        if not byLabel:
+            return key
+        position = axis.get_loc(key)
+        if isinstance(position, np.ndarray):
+            # A repeated label in an unsorted axis gives a boolean mask
+            return np.flatnonzero(position)
+        # A slice (i.e. a partial date string like "2013-07", or a repeated label in a sorted axis) keeps the axis
+        return position
+    key = np.asarray(key)
+    if key.dtype == bool:
+        return np.flatnonzero(key)
+    if not byLabel:
+        return key
+    positions = axis.get_indexer(key)
+    if (positions < 0).any():
+        raise KeyError("Labels not found: {}".format(list(key[positions < 0])))
+    return positions
+
+def _wrap(values, axes):
+    """
+    Values with 0, 1, or 2 dimensions as a scalar, Series, or DataFrame; otherwise a LabeledArray
+    """
+    if values.ndim == 0:
+        return values[()]
+    if values.ndim == 1:
+        return pd.Series(values, index= axes[0])
+    if values.ndim == 2:
+        return pd.DataFrame(values, index= axes[0], columns= axes[1])
+    return LabeledArray(values, axes)
+
+def _orderedUnion(indexes):
+    """
+    Union of pandas Indexes, keeping labels in the order they first appear (rather than sorting them)
+    """
+    union = indexes[0]
+    for index in indexes[1:]:
+        if not index.equals(union):
+            union = union.append(index[ ~index.isin(union) ])
+    return union.rename(indexes[0].name)
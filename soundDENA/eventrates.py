@@ -0,0 +1,249 @@
+from . import events
+from . import timeabove
+
+import numpy as np
+import pandas as pd
+
+"""
+Noise-free intervals and event rates from SRCID data, for many sites at once
+
+These are the SPLAT tables of METRICS files (``noiseFreeInterval`` and ``eventAvg``), which are often
+missing from them. Both work on an :class:`soundDENA.events.EventIndex`, so every site is processed in one
+batch of array operations rather than one site (or one event) at a time::
+
+    index = soundDENA.events.eventIndex(soundDENA.metadata.query("unit == 'DENA'"))
+    nfi = soundDENA.eventrates.noiseFreeInterval(index, seasons= {"Summer": ("2015-05-15", "2015-09-15")})
+    nfi.loc["DENAFANG2015", "Summer"]
+
+    counts, lengths = soundDENA.eventrates.eventAverages(index)
+    counts.xs(1.1, level= "srcID")
+
+A noise-free interval is a gap between events, after overlapping events (of any source) are merged.
+Both tables are by hour of the day: the hour a gap or event starts in.
+"""
+
+## Percentiles of noise-free intervals in each hour
+nfiPercentiles = (10, 25, 50, 75, 90)
+
+def noiseFreeGaps(index, coverage= None):
+    """
+    Every noise-free interval at every site.
+
+    Parameters
+    ----------
+    index : soundDENA.events.EventIndex or DataFrame
+        Events of one or more sites. A DataFrame is taken to be SRCID data, as from ``soundDENA.srcid``
+        (one site) or ``soundDENA.srcid.all`` (many sites, with an outer ``siteID`` level).
+    coverage : dict of {str: (ndarray, ndarray)}, optional
+        For each :ref:`siteID`, sorted intervals (start and end arrays, in nanoseconds) of when the site was
+        recording, with touching intervals merged (as by :func:`soundDENA.compute.unionIntervals`).
+        Gaps that aren't wholly within recorded time are left out, since they may not be noise-free.
+        Sites without coverage keep all their gaps.
+
+    Returns
+    -------
+    site : int ndarray
+        Position of each gap's site in ``index.sites``
+    start, length : int64 ndarray
+        Start and length of each gap, in nanoseconds
+    """
+    index = asEventIndex(index)
+    site, start, reach = _siteUnions(index)
+    # A gap runs from the end of each union of events to the start of the next, at the same site
+    sameSite = site[1:] == site[:-1]
+    gapSite = site[:-1][sameSite]
+    gapStart = reach[:-1][sameSite]
+    gapLength = start[1:][sameSite] - gapStart
+
+    if coverage is not None:
+        keep = np.ones(len(gapSite), dtype= bool)
+        for siteID, (coveredStarts, coveredEnds) in coverage.items():
+            if siteID not in index.sites:
+                continue
+            atSite = gapSite == index.sites.get_loc(siteID)
+            keep[atSite] = _within(np.asarray(coveredStarts), np.asarray(coveredEnds), gapStart[atSite], gapStart[atSite] + gapLength[atSite])
+        gapSite, gapStart, gapLength = gapSite[keep], gapStart[keep], gapLength[keep]
+
+    return gapSite, gapStart, gapLength
+
+def noiseFreeInterval(index, percents= nfiPercentiles, seasons= None, coverage= None):
+    """
+    Percentiles of the lengths of noise-free intervals, by site, season, and hour of the day.
+
+    Parameters
+    ----------
+    index : soundDENA.events.EventIndex or DataFrame
+        Events of one or more sites, as for :func:`noiseFreeGaps`
+    percents : iterable of number, default :data:`nfiPercentiles`
+    seasons : dict of {str: (datetime-like, datetime-like)}, optional
+        Name and (inclusive) date range of each season, i.e. ``{"Summer": ("2015-06-01", "2015-08-31")}``.
+        Gaps are in the season they start in. By default, all data is one season called "All".
+    coverage : optional
+        When each site was recording, as for :func:`noiseFreeGaps`
+
+    Returns
+    -------
+    DataFrame
+        Lengths in seconds (linearly interpolated between gaps, as by ``numpy.percentile``), indexed by
+        [siteID, season, percentile (i.e. "50%")], with a column for each hour (0 to 23).
+        ``.loc[siteID, season]`` is laid out like the ``noiseFreeInterval`` table of a metrics file.
+    """
+    index = asEventIndex(index)
+    percents = list(percents)
+    seasonNames = list(seasons.keys()) if seasons is not None else ["All"]
+    site, start, length = noiseFreeGaps(index, coverage)
+
+    starts = pd.DatetimeIndex(start.view("datetime64[ns]"))
+    seasonCodes = timeabove._seasonCodes(starts, seasons)
+    keep = seasonCodes >= 0
+    # One group per (site, season, hour)
+    groups = ( (site[keep] * len(seasonNames) + seasonCodes[keep]) * 24 + starts.hour.values[keep] ).astype(np.int64)
+    nGroups = len(index.sites) * len(seasonNames) * 24
+    values = _groupPercentiles(groups, length[keep] / 1e9, nGroups, percents)
+
+    # (site, season, hour, percent) -> rows of (site, season, percent), columns of hour
+    values = values.reshape(len(index.sites), len(seasonNames), 24, len(percents)).transpose(0, 1, 3, 2)
+    rows = pd.MultiIndex.from_product([index.sites, seasonNames, [ "{:g}%".format(p) for p in percents ]], names= ["siteID", "Season", "percentile"])
+    table = pd.DataFrame(values.reshape(-1, 24), index= rows, columns= pd.Index(np.arange(24), name= "hour"))
+    # Leave out sites and seasons without any gaps
+    hasGaps = table.notnull().any(axis= 1).groupby(level= [0, 1]).transform("any")
+    return table[hasGaps.values]
+
+def eventAverages(index, seasons= None, days= None):
+    """
+    Average number of events per day, and average length of events, by site, season, ``srcID``, and hour of the day.
+
+    Parameters
+    ----------
+    index : soundDENA.events.EventIndex or DataFrame
+        Events of one or more sites, as for :func:`noiseFreeGaps`
+    seasons : dict of {str: (datetime-like, datetime-like)}, optional
+        Name and (inclusive) date range of each season. Events are in the season they start in.
+        By default, all data is one season called "All".
+    days : number, dict, or Series, optional
+        Number of days to average counts over: one number for every site and season, or a mapping from
+        ``(siteID, season)`` to a number. By default, the days in the season from each site's first
+        event to its last, inclusive (which may undercount deployments whose first or last days had no events).
+
+    Returns
+    -------
+    counts, lengths : DataFrame
+        Indexed by [siteID, season, srcID], with a column for each hour (0 to 23). Lengths are in seconds;
+        hours without events have NaN lengths. ``.loc[siteID, season]`` is laid out like the ``eventAvg``
+        tables of a metrics file. Only sources with events in a site and season are included.
+    """
+    index = asEventIndex(index)
+    seasonNames = list(seasons.keys()) if seasons is not None else ["All"]
+    starts = pd.DatetimeIndex(index.start.view("datetime64[ns]"))
+    seasonCodes = timeabove._seasonCodes(starts, seasons)
+    keep = seasonCodes >= 0
+    srcCodes, srcIDs = pd.factorize(index.srcID, sort= True)
+
+    shape = (len(index.sites), len(seasonNames), len(srcIDs), 24)
+    key = np.ravel_multi_index((index.site[keep], seasonCodes[keep], srcCodes[keep], starts.hour.values[keep]), shape)
+    counts = np.bincount(key, minlength= int(np.prod(shape))).reshape(shape)
+    lengthSums = np.bincount(key, weights= (index.end - index.start)[keep] / 1e9, minlength= int(np.prod(shape))).reshape(shape)
+
+    nDays = _days(index, seasons, seasonNames, starts, seasonCodes, days)
+    with np.errstate(divide= "ignore", invalid= "ignore"):
+        averageCounts = counts / nDays[:, :, np.newaxis, np.newaxis]
+        averageLengths = lengthSums / counts
+
+    rows = pd.MultiIndex.from_product([index.sites, seasonNames, srcIDs], names= ["siteID", "Season", "srcID"])
+    hours = pd.Index(np.arange(24), name= "hour")
+    hasEvents = counts.sum(axis= 3).ravel() > 0
+    return (
+        pd.DataFrame(averageCounts.reshape(-1, 24), index= rows, columns= hours)[hasEvents],
+        pd.DataFrame(averageLengths.reshape(-1, 24), index= rows, columns= hours)[hasEvents]
+    )
+
+def asEventIndex(data):
+    """
+    An :class:`soundDENA.events.EventIndex` of SRCID data: either one site's DataFrame (as from ``soundDENA.srcid``),
+    whose site is labeled "", or many sites' (as from ``soundDENA.srcid.all``). An EventIndex is returned as is.
+    """
+    if isinstance(data, events.EventIndex):
+        return data
+    if isinstance(data.index, pd.MultiIndex):
+        return events.EventIndex.merge(*[ events.EventIndex.fromFrame(siteData.xs(siteID, level= 0), siteID) for siteID, siteData in data.groupby(level= 0, sort= False) ])
+    return events.EventIndex.fromFrame(data, "")
+
+def _siteUnions(index):
+    """
+    Merge overlapping events within each site, for all sites at once.
+
+    Returns the site, start, and end of each merged interval, sorted by site then start.
+    """
+    order = np.lexsort((index.start, index.site))
+    site, start, end = index.site[order], index.start[order], index.end[order]
+    if len(site) == 0:
+        return site, start, end
+
+    # Running maximum of ends within each site: since sites are in order, it's the running maximum of
+    # (site, end) pairs, which is the running maximum of their ranks
+    pairOrder = np.lexsort((end, site))
+    rank = np.empty(len(end), dtype= np.int64)
+    rank[pairOrder] = np.arange(len(end))
+    reach = end[ pairOrder[np.maximum.accumulate(rank)] ]
+
+    newRun = np.ones(len(start), dtype= bool)
+    newRun[1:] = (site[1:] != site[:-1]) | (start[1:] > reach[:-1])
+    runStarts = np.flatnonzero(newRun)
+    runEnds = np.concatenate([ runStarts[1:], [len(start)] ]) - 1
+    return site[runStarts], start[runStarts], reach[runEnds]
+
+def _within(starts, ends, lo, hi):
+    """
+    Whether each window ``[lo, hi)`` lies wholly within one of the sorted, disjoint intervals
+    """
+    if len(starts) == 0:
+        return np.zeros(len(lo), dtype= bool)
+    k = np.searchsorted(starts, lo, side= "right") - 1
+    return (k >= 0) & (hi <= ends[np.maximum(k, 0)])
+
+def _groupPercentiles(groups, values, nGroups, percents):
+    """
+    Percentiles of the values in each group (linearly interpolated, as by ``numpy.percentile``).
+    Returns an array of shape (nGroups, len(percents)), NaN for empty groups.
+    """
+    result = np.full((nGroups, len(percents)), np.nan)
+    if len(values) == 0:
+        return result
+    order = np.lexsort((values, groups))
+    groups, values = groups[order], values[order]
+    bounds = np.searchsorted(groups, np.arange(nGroups + 1), side= "left")
+    lo, count = bounds[:-1], np.diff(bounds)
+    present = count > 0
+    for j, percent in enumerate(percents):
+        position = (count[present] - 1) * percent / 100
+        below = np.floor(position).astype(np.int64)
+        above = np.minimum(below + 1, count[present] - 1)
+        fraction = position - below
+        first = values[lo[present] + below]
+        result[present, j] = first + (values[lo[present] + above] - first) * fraction
+    return result
+
+def _days(index, seasons, seasonNames, starts, seasonCodes, days):
+    """
+    Number of days to average counts over, as an array of (site, season)
+    """
+    nDays = np.zeros((len(index.sites), len(seasonNames)))
+    if days is not None and np.isscalar(days):
+        nDays[:] = days
+        return nDays
+    if days is not None:
+        days = pd.Series(days)
+        for i, siteID in enumerate(index.sites):
+            for s, season in enumerate(seasonNames):
+                nDays[i, s] = days.get((siteID, season), np.nan)
+        return nDays
+
+    dates = starts.normalize()
+    for i in range(len(index.sites)):
+        atSite = index.site == i
+        if not atSite.any():
+            continue
+        spanned = pd.date_range(dates[atSite].min(), dates[atSite].max(), freq= "D")
+        spannedSeasons = timeabove._seasonCodes(spanned, seasons)
+        nDays[i] = np.bincount(spannedSeasons[spannedSeasons >= 0], minlength= len(seasonNames))
+    return nDays
@@ -0,0 +1,382 @@
+from . import accessor
+from . import accessors
+from . import paths
+
+import numpy as np
+import pandas as pd
+import time
+
+"""
+An index of SRCID events across many sites, for finding which events overlap a time window
+
+Each event covers ``[start, start + len)``, where start is its time in the SRCID file.
+Events from every site are kept in one set of arrays, sorted by start, along with the running
+maximum of their ends. Since every event before position ``i`` ends by ``reach[i - 1]``, one binary
+search on the reach and one on the starts bound the events that can overlap any window, so queries
+take time proportional to the number of events found, not the number indexed::
+
+    index = soundDENA.events.eventIndex(soundDENA.metadata.query("unit == 'DENA'"))
+    index.save("DENA_events.npz")
+
+    index.overlapping("2015-07-04 12:00", "2015-07-04 13:00")
+    index.at("2015-07-04 12:30", srcIDs= [1.1, 1.2])
+    index.select(srcIDs= [1.1]).countOverlapping(hourStarts, hourEnds)
+"""
+
+class EventIndex:
+    """
+    SRCID events from many sites, sorted by start time.
+
+    Attributes
+    ----------
+    sites : pandas Index
+        :ref:`siteID` of every site that has been added
+    site : int32 ndarray
+        Position in :attr:`sites` of each event's site
+    start, end : int64 ndarray
+        Start and end of each event, in nanoseconds since the epoch (like ``numpy.datetime64[ns]``)
+    srcID : float64 ndarray
+    reach : int64 ndarray
+        Running maximum of :attr:`end`: no event before position ``i`` ends after ``reach[i - 1]``
+    """
+    def __init__(self, sites, site, start, end, srcID):
+        self.sites = pd.Index(sites, dtype= object)
+        order = np.argsort(start, kind= "mergesort")
+        self.site = np.asarray(site, dtype= np.int32)[order]
+        self.start = np.asarray(start, dtype= np.int64)[order]
+        self.end = np.asarray(end, dtype= np.int64)[order]
+        self.srcID = np.asarray(srcID, dtype= np.float64)[order]
+        self._index()
+
+    def _index(self):
+        self.reach = np.maximum.accumulate(self.end) if len(self.end) > 0 else self.end.copy()
+        self._sortedEnds = None
+
+    @classmethod
+    def empty(cls):
+        return cls([], np.array([], dtype= np.int32), np.array([], dtype= np.int64), np.array([], dtype= np.int64), np.array([], dtype= np.float64))
+
+    @classmethod
+    def fromFrame(cls, data, site):
+        """
+        Index the events in one site's SRCID data.
+
+        Parameters
+        ----------
+        data : DataFrame
+            As returned by ``soundDENA.srcid``. Rows without a ``srcID`` or length (i.e. noise-free days) are skipped.
+        site : str
+            :ref:`siteID` of the site the data is from
+        """
+        valid = data.srcID.notnull().values & data.len.notnull().values
+        start = data.index.values[valid].astype("datetime64[ns]").view(np.int64)
+        end = start + data.len.values[valid].astype("timedelta64[ns]").view(np.int64)
+        return cls([site], np.zeros(len(start), dtype= np.int32), start, end, data.srcID.values[valid])
+
+    @classmethod
+    def merge(cls, *indexes):
+        """
+        Combine the events of several indexes into one.
+        """
+        if len(indexes) == 0:
+            return cls.empty()
+        sites = pd.Index([], dtype= object)
+        for index in indexes:
+            sites = sites.append(index.sites[ ~index.sites.isin(sites) ])
+
+        siteCodes = [ sites.get_indexer(index.sites).astype(np.int32)[index.site] for index in indexes ]
+        # Each index is already sorted by start, so the (stable) mergesort only has to merge sorted runs
+        return cls(
+            sites,
+            np.concatenate(siteCodes),
+            np.concatenate([ index.start for index in indexes ]),
+            np.concatenate([ index.end for index in indexes ]),
+            np.concatenate([ index.srcID for index in indexes ])
+        )
+
+    def add(self, data, site):
+        """
+        Add one site's SRCID data (as returned by ``soundDENA.srcid``) to the index, in place.
+        """
+        merged = self.merge(self, self.fromFrame(data, site))
+        self.sites, self.site, self.start, self.end, self.srcID = merged.sites, merged.site, merged.start, merged.end, merged.srcID
+        self._index()
+        return self
+
+    def __len__(self):
+        return len(self.start)
+
+    def __repr__(self):
+        return "<EventIndex: {} events from {} sites>".format(len(self), len(self.sites))
+
+    ## Queries
+
+    def positions(self, start, end):
+        """
+        Positions of the events that overlap the window ``[start, end)``, in order of start.
+        """
+        lo, hi = _ns(start), _ns(end)
+        first = np.searchsorted(self.reach, lo, side= "right")
+        last = np.searchsorted(self.start, hi, side= "left")
+        return first + np.flatnonzero(self.end[first:last] > lo)
+
+    def overlapping(self, start, end, sites= None, srcIDs= None):
+        """
+        Events that overlap the window ``[start, end)``.
+
+        Parameters
+        ----------
+        start, end : datetime-like
+        sites : iterable of str, optional
+            Only include events from these :ref:`siteID` s
+        srcIDs : iterable of number, optional
+            Only include events with these ``srcID`` s
+
+        Returns
+        -------
+        DataFrame
+            With the columns ``siteID``, ``start``, ``end``, and ``srcID``, sorted by start
+        """
+        return self.frame( self._filter(self.positions(start, end), sites, srcIDs) )
+
+    def at(self, time, sites= None, srcIDs= None):
+        """
+        Events happening at an instant (``start <= time < end``), as a DataFrame like :meth:`overlapping`.
+        """
+        t = _ns(time)
+        return self.frame( self._filter(self.positions(t, t + 1), sites, srcIDs) )
+
+    def countOverlapping(self, starts, ends):
+        """
+        Number of events that overlap each of many windows ``[start, end)``, all at once.
+
+        An event overlaps a window unless it starts at or after the window's end, or ends at or before its start,
+        so the count is just two binary searches per window. Use :meth:`select` first to count only some sites or sources.
+
+        Parameters
+        ----------
+        starts, ends : array-like of datetime-like
+
+        Returns
+        -------
+        int64 ndarray
+        """
+        if self._sortedEnds is None:
+            self._sortedEnds = np.sort(self.end)
+        startedBefore = np.searchsorted(self.start, _ns(ends), side= "left")
+        endedBefore = np.searchsorted(self._sortedEnds, _ns(starts), side= "right")
+        return (startedBefore - endedBefore).astype(np.int64)
+
+    def select(self, sites= None, srcIDs= None):
+        """
+        A new index of only the events from some sites, or with some ``srcID`` s.
+        Repeated queries for the same sites or sources are faster on the smaller index than filtering every time.
+        """
+        keep = self._filter(np.arange(len(self)), sites, srcIDs)
+        return EventIndex(self.sites, self.site[keep], self.start[keep], self.end[keep], self.srcID[keep])
+
+    def bySrcID(self):
+        """
+        Split the index into one index per ``srcID``.
+
+        Returns
+        -------
+        dict of {float: EventIndex}
+        """
+        return { srcID: self.select(srcIDs= [srcID]) for srcID in np.unique(self.srcID) }
+
+    def frame(self, positions= None):
+        """
+        The events at ``positions`` (default all of them) as a DataFrame, with the columns ``siteID``, ``start``, ``end``, and ``srcID``
+        """
+        positions = positions if positions is not None else slice(None)
+        return pd.DataFrame({
+            "siteID": self.sites.values[self.site[positions]],
+            "start": self.start[positions].view("datetime64[ns]"),
+            "end": self.end[positions].view("datetime64[ns]"),
+            "srcID": self.srcID[positions]
+        }, columns= ["siteID", "start", "end", "srcID"])
+
+    def _filter(self, positions, sites, srcIDs):
+        if sites is not None:
+            siteCodes = self.sites.get_indexer(pd.Index(list(sites), dtype= object))
+            positions = positions[ np.isin(self.site[positions], siteCodes[siteCodes >= 0]) ]
+        if srcIDs is not None:
+            positions = positions[ np.isin(self.srcID[positions], np.asarray(list(srcIDs), dtype= np.float64)) ]
+        return positions
+
+    ## Storage
+
+    def save(self, path):
+        """
+        Save to a ``.npz`` file
+        """
+        np.savez(
+            str(path),
+            sites= np.asarray(self.sites, dtype= str),
+            site= self.site, start= self.start, end= self.end, srcID= self.srcID
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load an index saved with :meth:`save`
+        """
+        with np.load(str(path)) as f:
+            return cls(list(f["sites"]), f["site"], f["start"], f["end"], f["srcID"])
+
+
+def _ns(times):
+    """
+    Datetime-like (or array of them) to int64 nanoseconds since the epoch
+    """
+    if np.ndim(times) == 0:
+        if isinstance(times, (int, np.integer)):
+            return np.int64(times)
+        return np.int64(pd.Timestamp(times).value)
+    return pd.DatetimeIndex(times).values.astype("datetime64[ns]").view(np.int64)
+
+def eventIndex(sites, quiet= True, workers= None):
+    """
+    Build an :class:`EventIndex` of every event in the SRCID files of many sites.
+
+    Parameters
+    ----------
+    sites : iterable
+        :ref:`siteID` strings, or a pandas structure indexed by :ref:`siteID`
+    quiet : boolean, default True
+        Whether to not print progress
+    workers : int, optional
+        Number of SRCID files to read concurrently, in threads. None or 1 reads one at a time.
+        Sites without a SRCID file, or whose file can't be read, are left out.
+
+    Returns
+    -------
+    EventIndex
+    """
+    start_t = time.time()
+    # Read through an Accessor, for its caching and per-site error handling: a site whose SRCID file
+    # is missing or can't be parsed is reported (unless quiet) and left out, rather than stopping the rest
+    indexes = [
+        EventIndex.fromFrame(data, paths.siteID(unit, site, year))
+        for data, unit, site, year in _srcidAccessor(sites, quiet= quiet, siteWorkers= workers)
+    ]
+
+    index = EventIndex.merge(*indexes)
+    if not quiet: print("Indexed {} events from {} sites in {:.1f} sec".format(len(index), len(index.sites), time.time() - start_t))
+    return index
+
+# The same as ``soundDENA.srcid``, which shares its caches (they're keyed by the Accessor's name)
+_srcidAccessor = accessor.Accessor(accessors.srcid, accessors.srcidPath, name= "srcid")
+
+
+## Event levels
+
+def eventLevelsPaths(dataDir, unit, site, year, **kwargs):
+    # **kwargs used to handle being given keyword args for eventLevels() and nvsplPaths() as well
+    """
+    Return the sources needed to measure the levels of a site's SRCID events: its NVSPL
+    (as from :func:`soundDENA.accessors.nvsplPaths`) and the path to its SRCID file.
+
+    This function follows the signature for ``pathToData()`` as defined in :meth:`soundDENA.Accessor.__init__`.
+    """
+    return accessors.nvsplPaths(dataDir, unit, site, year, **kwargs), accessors.srcidPath(dataDir, unit, site, year)
+
+def eventLevels(sources, bands= None, **kwargs):
+    # **kwargs used to handle being given keyword args for nvsplPaths() and nvsplStream() as well
+    """
+    Measure each SRCID event's levels from the site's 1-second NVSPL data.
+
+    The NVSPL samples within each event (``start <= time < start + len``) are found by binary search,
+    and reduced for all events at once, one day of NVSPL at a time.
+
+    Parameters
+    ----------
+    sources : tuple
+        NVSPL source and SRCID path, as returned by :func:`eventLevelsPaths`
+
+    Keyword Args
+    ------------
+    bands : list of str, optional
+        Which NVSPL level columns (i.e. "dbA" or "1000") to measure. Defaults to all of them (``soundDENA.accessors.nvsplLevels``).
+    kwargs
+        Any other keyword arguments for :func:`soundDENA.accessors.nvsplStream`, i.e. **start** and **end**
+
+    Returns
+    -------
+    DataFrame
+        One row per event (noise-free days are left out), indexed by the start of the event, with the columns:
+
+        + ``srcID``, ``len``, ``MaxSPLt``, and ``SELt``: from the SRCID file (older files lack the last two)
+        + ``n``: number of NVSPL samples within the event
+        + ``("Lmax", band)``: loudest sample, in dB
+        + ``("SEL", band)``: sound exposure level (the total energy of the samples, as a level over 1 second), in dB
+        + ``("Leq", band)``: energetic mean of the samples, in dB; across bands, the event's spectrum
+
+        Events with no NVSPL samples have NaN levels.
+    """
+    nvsplSource, srcidPath = sources
+    bands = list(bands) if bands is not None else accessors.nvsplLevels
+
+    data = accessors.srcid(srcidPath)
+    valid = data.srcID.notnull().values & data.len.notnull().values
+    data = data[valid]
+    starts = data.index.values.astype("datetime64[ns]").view(np.int64)
+    ends = starts + data.len.values.astype("timedelta64[ns]").view(np.int64)
+
+    chunks = ( chunk[[ band for band in bands if band in chunk.columns ]].reindex(columns= bands) for chunk in accessors.nvsplStream(nvsplSource, chunk= "1d", **kwargs) )
+    energy, counts, maxima = _eventReductions(starts, ends, chunks, len(bands))
+
+    # NVSPL samples are 1 second long
+    sampleLength = 1
+    with np.errstate(divide= "ignore", invalid= "ignore"):
+        sel = 10 * np.log10(energy * sampleLength)
+        leq = 10 * np.log10(energy / counts)
+    sel[counts == 0] = np.nan
+    leq[counts == 0] = np.nan
+
+    n = counts.max(axis= 1) if len(bands) > 0 else np.zeros(len(starts), dtype= np.int64)
+    result = pd.concat([
+        pd.DataFrame({ (column, ""): data[column].values for column in ("srcID", "len", "MaxSPLt", "SELt") if column in data.columns }, index= data.index),
+        pd.DataFrame({ ("n", ""): n }, index= data.index),
+        pd.DataFrame(maxima, index= data.index, columns= pd.MultiIndex.from_product([["Lmax"], bands])),
+        pd.DataFrame(sel, index= data.index, columns= pd.MultiIndex.from_product([["SEL"], bands])),
+        pd.DataFrame(leq, index= data.index, columns= pd.MultiIndex.from_product([["Leq"], bands]))
+    ], axis= 1)
+    return result
+
+def _eventReductions(starts, ends, chunks, nBands):
+    """
+    For each event ``[start, end)``, the sum of energy, number of valid samples, and maximum level
+    of each band, over every sample in a series of chronological DataFrames.
+
+    Events can span several chunks; since these reductions combine, each chunk's part is reduced separately and added on.
+    """
+    energy = np.zeros((len(starts), nBands))
+    counts = np.zeros((len(starts), nBands), dtype= np.int64)
+    maxima = np.full((len(starts), nBands), np.nan)
+
+    for chunk in chunks:
+        times = chunk.index.values.astype("datetime64[ns]").view(np.int64)
+        first = np.searchsorted(times, starts, side= "left")
+        last = np.searchsorted(times, ends, side= "left")
+        hit = np.flatnonzero(last > first)
+        if len(hit) == 0:
+            continue
+
+        # Pad with one row, so events that run to the end of the chunk still have an index to stop at
+        levels = np.vstack([ chunk.values.astype(np.float64), np.full((1, nBands), np.nan) ])
+        valid = np.isfinite(levels)
+        chunkEnergy = np.where(valid, 10 ** (levels / 10), 0)
+
+        # reduceat over [first0, last0, first1, last1, ...] reduces each event's rows at the even positions
+        bounds = np.column_stack([ first[hit], last[hit] ]).ravel()
+        energy[hit] += np.add.reduceat(chunkEnergy, bounds, axis= 0)[::2]
+        counts[hit] += np.add.reduceat(valid.astype(np.int64), bounds, axis= 0)[::2]
+        maxima[hit] = np.fmax(maxima[hit], np.fmax.reduceat(levels, bounds, axis= 0)[::2])
+
+    return energy, counts, maxima
+
+eventExports = {
+    "eventlevels": (eventLevels, eventLevelsPaths)
+}
@@ -0,0 +1,207 @@
+import numpy as np
+import pandas as pd
+
+"""
+Regular-grid representation of evenly-sampled data (i.e. 1-second NVSPL)
+
+Rather than storing a timestamp for every row, data is split into contiguous segments,
+each described by just a start time and a number of rows at a fixed step. Finding the row
+for a time is arithmetic on the segment's start, instead of a search through a DatetimeIndex.
+Missing rows within a segment (short gaps) are marked invalid by a mask; segments without
+gaps have no mask at all.
+"""
+
+class Segment:
+    """
+    A contiguous run of rows, evenly spaced in time.
+
+    Attributes
+    ----------
+    start : int
+        Time of the first row, as nanoseconds since the epoch (like ``numpy.datetime64[ns]``)
+    values : 2D ndarray
+        One row per step, one column per column of the grid
+    valid : 1D boolean ndarray, or None
+        Which rows contain real data. None means all rows are valid.
+    """
+    __slots__ = ("start", "values", "valid")
+
+    def __init__(self, start, values, valid= None):
+        self.start = start
+        self.values = values
+        self.valid = valid
+
+    def __len__(self):
+        return len(self.values)
+
+    def nValid(self):
+        return len(self.values) if self.valid is None else int(self.valid.sum())
+
+
+class RegularGrid:
+    """
+    Evenly-sampled data stored as a list of :class:`Segment` objects, without an explicit time index.
+
+    Create one from a DataFrame with :meth:`fromFrame`, and convert back with :meth:`toFrame`.
+    """
+    def __init__(self, segments, columns, step, name= None):
+        """
+        Parameters
+        ----------
+        segments : list of Segment
+            In chronological order, and not overlapping
+        columns : pandas Index or list
+            Column labels, shared by all segments
+        step : int
+            Time between rows, in nanoseconds
+        name : str, optional
+            Name for the time axis when converted to a DataFrame
+        """
+        self.segments = segments
+        self.columns = pd.Index(columns)
+        self.step = int(step)
+        self.name = name
+        self._starts = np.array([segment.start for segment in segments], dtype= np.int64)
+        self._ends = np.array([segment.start + len(segment) * self.step for segment in segments], dtype= np.int64)
+
+    @classmethod
+    def fromFrame(cls, data, step= "1s", maxGap= "1h"):
+        """
+        Convert a DataFrame with a sorted DatetimeIndex into a RegularGrid.
+
+        Parameters
+        ----------
+        data : DataFrame
+            Indexed by time, i.e. from :func:`soundDENA.accessors.nvspl`. Only numeric columns are kept.
+        step : str or Timedelta, default "1s"
+            Sampling interval. Timestamps are rounded to the nearest step from the first row;
+            if two rows round to the same step, the first one is kept.
+        maxGap : str or Timedelta, default "1h"
+            Gaps longer than this start a new segment. Shorter gaps are stored as invalid rows.
+
+        Returns
+        -------
+        RegularGrid
+        """
+        step = pd.Timedelta(step).value
+        maxGap = pd.Timedelta(maxGap).value
+        data = data.select_dtypes(include= [np.number])
+        name = data.index.name
+
+        times = data.index.values.astype("datetime64[ns]").view(np.int64)
+        if len(times) == 0:
+            return cls([], data.columns, step, name)
+        if np.any(np.diff(times) < 0):
+            raise ValueError("Data must be sorted by time to convert to a RegularGrid")
+
+        origin = times[0]
+        slots = (times - origin + step // 2) // step
+        # Drop rows that round to the same slot as the row before
+        keep = np.ones(len(slots), dtype= bool)
+        keep[1:] = np.diff(slots) > 0
+        slots = slots[keep]
+        values = data.values[keep]
+
+        # Split into segments wherever the gap between rows is too long
+        breaks = np.flatnonzero( np.diff(slots) * step > maxGap ) + 1
+        bounds = np.concatenate([[0], breaks, [len(slots)]])
+
+        segments = []
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            segmentSlots = slots[lo:hi] - slots[lo]
+            n = segmentSlots[-1] + 1
+            start = origin + slots[lo] * step
+            if n == hi - lo:
+                # No gaps: store the rows as-is
+                segments.append( Segment(start, values[lo:hi]) )
+            else:
+                fill = np.nan if values.dtype.kind == "f" else 0
+                segmentValues = np.full((n, values.shape[1]), fill, dtype= values.dtype)
+                segmentValues[segmentSlots] = values[lo:hi]
+                valid = np.zeros(n, dtype= bool)
+                valid[segmentSlots] = True
+                segments.append( Segment(start, segmentValues, valid) )
+
+        return cls(segments, data.columns, step, name)
+
+    def __len__(self):
+        """
+        Number of valid rows
+        """
+        return sum( segment.nValid() for segment in self.segments )
+
+    @property
+    def start(self):
+        return pd.Timestamp(self._starts[0]) if len(self.segments) > 0 else None
+
+    @property
+    def end(self):
+        return pd.Timestamp(self._ends[-1] - self.step) if len(self.segments) > 0 else None
+
+    def locate(self, time):
+        """
+        Return (segment number, row number within segment) for the row at a time.
+
+        Raises KeyError if the time falls in a gap or outside the data.
+        """
+        t = pd.Timestamp(time).value
+        i = np.searchsorted(self._starts, t, side= "right") - 1
+        if i >= 0 and t < self._ends[i]:
+            offset = t - self._starts[i]
+            if offset % self.step == 0:
+                row = offset // self.step
+                segment = self.segments[i]
+                if segment.valid is None or segment.valid[row]:
+                    return i, int(row)
+        raise KeyError(time)
+
+    def at(self, time):
+        """
+        Return the row at a time as a Series.
+        """
+        i, row = self.locate(time)
+        return pd.Series(self.segments[i].values[row], index= self.columns, name= pd.Timestamp(time))
+
+    def slice(self, start= None, end= None):
+        """
+        Return a RegularGrid of just the rows between start and end (inclusive).
+        Segments' values are views into this grid's arrays, not copies.
+        """
+        lo = pd.Timestamp(start).value if start is not None else np.iinfo(np.int64).min
+        hi = pd.Timestamp(end).value if end is not None else np.iinfo(np.int64).max
+
+        segments = []
+        for segment, segmentStart, segmentEnd in zip(self.segments, self._starts, self._ends):
+            if segmentEnd <= lo or segmentStart > hi:
+                continue
+            first = max(0, -(-(lo - segmentStart) // self.step))   # ceiling division
+            last = min(len(segment), (hi - segmentStart) // self.step + 1)
+            if first >= last:
+                continue
+            valid = segment.valid[first:last] if segment.valid is not None else None
+            segments.append( Segment(segmentStart + first * self.step, segment.values[first:last], valid) )
+        return RegularGrid(segments, self.columns, self.step, self.name)
+
+    def index(self, segment):
+        """
+        The DatetimeIndex of a segment's valid rows
+        """
+        times = segment.start + np.arange(len(segment), dtype= np.int64) * self.step
+        if segment.valid is not None:
+            times = times[segment.valid]
+        return pd.DatetimeIndex(times.view("datetime64[ns]"), name= self.name)
+
+    def toFrame(self):
+        """
+        Convert to a DataFrame indexed by time, with only the valid rows.
+        """
+        if len(self.segments) == 0:
+            return pd.DataFrame(columns= self.columns, index= pd.DatetimeIndex([], name= self.name))
+        frames = []
+        for segment in self.segments:
+            values = segment.values if segment.valid is None else segment.values[segment.valid]
+            frames.append( pd.DataFrame(values, index= self.index(segment), columns= self.columns) )
+        return pd.concat(frames)
+
+    def __repr__(self):
+        return "<RegularGrid: {} rows in {} segments, {} to {}, step {}>".format(len(self), len(self.segments), self.start, self.end, pd.Timedelta(self.step))
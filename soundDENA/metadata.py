@@ -1,12 +1,13 @@
 import pandas as pd
 import numpy as np
 import pathlib
+import os
 
 from . import paths
 
+# Where the merged metadata is saved between sessions
+savedMetadata = paths.cache / "metadata.pkl"
 
-# TODO: save the result, and recompute it only when its date modified is older than the
-# date modified of metadata or derived data
 def fullMetadata():
     """
     Returns a DataFrame of metadata merged with derived data, with overlapping
@@ -28,7 +29,17 @@ def fullMetadata():
     -------
     DataFrame
         Indexed by siteID (the 12-character code of UNITSITEYEAR, i.e. DENAUPST2015)
+
+    This always re-reads both workbooks, and replaces the saved copy used by ``soundDENA.metadata``.
     """
+    full = _readMetadataWorkbooks()
+    _save(full)
+
+    global _metadata
+    _metadata = full
+    return full
+
+def _readMetadataWorkbooks():
     derivedData = pd.read_excel(str(paths.derivedData))
     metadata = pd.read_excel(str(paths.metadata))
     derivedData.columns = derivedData.columns.str.lower()
@@ -65,4 +76,56 @@ def fullMetadata():
 
     return full
 
-metadata = fullMetadata()
+def _save(full):
+    try:
+        savedMetadata.parent.mkdir(parents= True, exist_ok= True)
+        tmpPath = savedMetadata.with_suffix(".tmp{}".format(os.getpid()))
+        full.to_pickle(str(tmpPath))
+        os.replace(str(tmpPath), str(savedMetadata))
+    except OSError:
+        # Not being able to save is only a performance problem
+        pass
+
+def _savedIsCurrent():
+    """
+    Whether the saved metadata is newer than both workbooks.
+    If the workbooks can't be reached (i.e. T: isn't mapped), the saved copy is the best we have.
+    """
+    try:
+        savedTime = os.stat(str(savedMetadata)).st_mtime
+    except OSError:
+        return False
+    for workbook in (paths.derivedData, paths.metadata):
+        try:
+            if os.stat(str(workbook)).st_mtime > savedTime:
+                return False
+        except OSError:
+            continue
+    return True
+
+_metadata = None
+def loadMetadata():
+    """
+    Return the merged metadata DataFrame (the same as :func:`fullMetadata`), without re-reading
+    the workbooks unless necessary.
+
+    The result is kept in memory after the first call. Between sessions, it's saved in
+    :attr:`soundDENA.paths.cache`, and only rebuilt from the workbooks when either of them
+    has been modified since it was saved.
+    """
+    global _metadata
+    if _metadata is None:
+        if _savedIsCurrent():
+            try:
+                _metadata = pd.read_pickle(str(savedMetadata))
+            except Exception:
+                _metadata = None
+        if _metadata is None:
+            fullMetadata()
+    return _metadata
+
+def __getattr__(name):
+    # Compute `metadata` on first access, rather than reading the workbooks on import
+    if name == "metadata":
+        return loadMetadata()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -1,5 +1,6 @@
 import pathlib
 import re
+import os
 import pandas
 
 ###############
@@ -37,12 +38,20 @@ computed = analysis / "Computational Outputs"
 
 microarray = wav / "Microarray"
 
+##############
+### Local cache
+
+# Where soundDENA keeps derived files (caches, indices) on the local machine,
+# so they can be reused across sessions without touching the raw data drive
+cache = pathlib.Path(os.path.expanduser("~")) / ".soundDENA"
+
 #################
 #### METHODS ####
 #################
 
 _siteID_regex = re.compile(r"^([\w\d]{4})([\w\d]{4})(\d{4})$")
 _dataDir_regex = re.compile(r"^(\d{4}) ([\w\d]{4})([\w\d]{4}) (.*)")
+_nvsplFile_regex = re.compile(r"^NVSPL_([\w\d]{4})([\w\d]{4})_?(\d{4})_(\d{2})_(\d{2})_(\d{2})$")
 
 def splitSiteID(siteID):
     """
@@ -74,19 +83,41 @@ def splitDataDir(dataDir):
         return (unit, site, year, title)
     else:
         raise ValueError("Invalid data dir name: '{}'".format(dataDir))
+def splitNvsplFilename(filename):
+    """
+    Returns a 3-tuple of unit, site, and the start of the hour (datetime.datetime) covered by an NVSPL file
+    (pathlib.Path, or string). NVSPL file names are formatted as: NVSPL_UNITSITE_YYYY_MM_DD_HH.txt,
+    i.e. NVSPL_DENAFANG_2013_07_01_13.txt
+    """
+    import datetime
+    match = _nvsplFile_regex.match(pathlib.Path(filename).stem)
+    if match:
+        unit, site, year, month, day, hour = match.groups()
+        return (unit, site, datetime.datetime(int(year), int(month), int(day), int(hour)))
+    else:
+        raise ValueError("Invalid NVSPL file name: '{}'".format(filename))
+
 def dataDir(unit, site, year, title= ''):
     """
     Formats unit, site, year, and title into the name of a data directory (i.e. 2014 DENABACK Backside Lake)
     """
     return "{} {}{} {}".format(year, unit, site, title)
 
-## Make lookup dict of all data dirs immediately upon import
+## Lookup dict of all data dirs, built on first use.
+## Scanning the raw data drive is slow, so the lookup is saved in the local cache,
+## and only rebuilt when the raw data directory itself has been modified (i.e. a site added or renamed).
 _allDataDirs = {}
+_dataDirsLoaded = False
+savedDataDirs = cache / "dataDirs.pkl"
+
 def _buildDataDirLookup(newRawData= None):
-    global rawdata
+    global rawdata, _dataDirsLoaded
     if newRawData is not None:
         rawdata = pathlib.Path(newRawData)
+    _allDataDirs.clear()
+    _dataDirsLoaded = True
     try:
+        rootModified = os.stat(str(rawdata)).st_mtime_ns
         for dataDir in rawdata.iterdir():
             try:
                 unit, site, year, title = splitDataDir(dataDir)
@@ -96,13 +127,54 @@ def _buildDataDirLookup(newRawData= None):
         if len(_allDataDirs) == 0:
             import warnings
             warnings.warn("No site data directories found in {}. Check if this is really the correct path to the raw data directory.".format(str(rawdata)))
+        else:
+            _saveDataDirLookup(rootModified)
     except FileNotFoundError:
         import warnings
         warnings.warn('Raw data directory "{}" not found (the drive may be disconnected). Most data-accessing functions will raise exceptions.'.format(str(rawdata)))
     except PermissionError:
         import warnings
         warnings.warn('Permission denied to access data directory "{}". Most data-accessing functions will raise exceptions.'.format(str(rawdata)))
-_buildDataDirLookup()
+
+def _saveDataDirLookup(rootModified):
+    import pickle
+    try:
+        savedDataDirs.parent.mkdir(parents= True, exist_ok= True)
+        tmpPath = savedDataDirs.with_suffix(".tmp{}".format(os.getpid()))
+        with tmpPath.open("wb") as f:
+            pickle.dump( (str(rawdata), rootModified, _allDataDirs), f, protocol= pickle.HIGHEST_PROTOCOL )
+        os.replace(str(tmpPath), str(savedDataDirs))
+    except OSError:
+        pass
+
+def _loadSavedDataDirLookup():
+    """
+    Fill the lookup from the saved copy, if it was made from the same raw data directory
+    and that directory hasn't been modified since. Returns whether it succeeded.
+    """
+    global _dataDirsLoaded
+    import pickle
+    try:
+        rootModified = os.stat(str(rawdata)).st_mtime_ns
+        with savedDataDirs.open("rb") as f:
+            savedRawData, savedRootModified, savedLookup = pickle.load(f)
+    except Exception:
+        return False
+    if savedRawData != str(rawdata) or savedRootModified != rootModified:
+        return False
+    _allDataDirs.clear()
+    _allDataDirs.update(savedLookup)
+    _dataDirsLoaded = True
+    return True
+
+def _dataDirLookup():
+    """
+    Return the dict of { (unit, site, year): pathlib.Path to data directory }, building it if necessary.
+    """
+    if not _dataDirsLoaded:
+        if not _loadSavedDataDirLookup():
+            _buildDataDirLookup()
+    return _allDataDirs
 
 def getDataDirPath(*args):
     """
@@ -121,7 +193,7 @@ def getDataDirPath(*args):
         raise TypeError("getDataDirPath() takes either a site ID string or unit, site, year - got {} arguments".format(len(args)))
 
     try:
-        return _allDataDirs[split]
+        return _dataDirLookup()[tuple(split)]
     except KeyError:
         raise IOError("No data directory found for {}{} in {}".format(*split))
 
@@ -156,9 +228,10 @@ def dataDirs(sites, quiet= True):
 
     if not quiet and len(invalidIDs) > 0: print("Invalid site IDs given: {}".format(invalidIDs))
     ## Yield corresponding directories
+    allDataDirs = _dataDirLookup()
     for unit, site, year in splitIDs:
         try:
-            dataDir = _allDataDirs[(unit, site, year)]
+            dataDir = allDataDirs[(unit, site, year)]
             yield dataDir, unit, site, year
         except KeyError:
             if not quiet: print( "No data available on the raw data drive for {}{} in {}, skipping".format(unit, site, year) )
@@ -0,0 +1,207 @@
+from . import archive
+
+import numpy as np
+import pandas as pd
+import pathlib
+import shutil
+import os
+
+"""
+Multi-resolution pyramids of time-averaged data (i.e. NVSPL levels)
+
+A pyramid stores the same data averaged over successively longer periods (10 seconds,
+1 minute, 10 minutes, 1 hour), each level built from the one below it. Reading a month of
+data at 1-minute resolution then means reading 43,200 rows instead of re-averaging 2.6 million.
+
+Sound levels are averaged in the energy domain (as in :meth:`soundDENA.accessors.metricsReader.splMean`):
+``10 * log10( mean(10**(L/10)) )``. Every level also stores how many samples went into each
+mean (per column, since some columns have missing samples), so that averaging means from one level
+to the next weighs them correctly, and the result is the same as averaging the original samples.
+
+Each level is a :class:`soundDENA.archive.ColumnArchive`, with the columns ``("mean", label)``
+and ``("count", label)`` for each column of the original data.
+"""
+
+## Steps of each level of the pyramid. The first is the original sampling interval.
+levels = [ pd.Timedelta(step) for step in ("1s", "10s", "1min", "10min", "1h") ]
+
+def coarsestLevel(resolution, steps= None):
+    """
+    The longest step that evenly divides ``resolution``, so data at that step can be averaged
+    into bins of ``resolution`` exactly.
+
+    Parameters
+    ----------
+    resolution : str or Timedelta
+    steps : list of Timedelta, optional
+        Steps to choose from. Defaults to :data:`levels`.
+
+    Returns
+    -------
+    Timedelta
+    """
+    resolution = pd.Timedelta(resolution)
+    steps = steps if steps is not None else levels
+    candidates = [ step for step in steps if step <= resolution and resolution % step == pd.Timedelta(0) ]
+    if len(candidates) == 0:
+        raise ValueError("No pyramid level evenly divides a resolution of {}".format(resolution))
+    return max(candidates)
+
+def fromSamples(data):
+    """
+    Treat each row of data as one sample: return (means, counts), where counts are 1 for
+    every non-NaN value and 0 otherwise.
+    """
+    return data, data.notna().astype(np.int32)
+
+def aggregate(means, counts, step, energyColumns= ()):
+    """
+    Average means (weighted by their counts) into bins of a longer step.
+
+    Parameters
+    ----------
+    means : DataFrame
+        Indexed by time, sorted. Only numeric columns.
+    counts : DataFrame
+        The number of samples that went into each value of means (same shape)
+    step : str or Timedelta
+        Length of the bins to average into. Bins start at multiples of step (as by ``DatetimeIndex.floor``).
+    energyColumns : collection of column labels
+        Columns of levels in dB, which are averaged in the energy domain. Others are averaged arithmetically.
+
+    Returns
+    -------
+    means, counts : DataFrame
+        Indexed by the start of each bin. Bins without any rows are left out;
+        bins with rows but no valid samples for a column have NaN means.
+    """
+    step = pd.Timedelta(step)
+    if len(means) == 0:
+        index = pd.DatetimeIndex([], name= means.index.name)
+        return means.iloc[:0].set_axis(index, axis= 0), counts.iloc[:0].set_axis(index, axis= 0)
+
+    bins = means.index.floor(step)
+    binTimes = bins.values.view(np.int64)
+    starts = np.concatenate([ [0], np.flatnonzero(binTimes[1:] != binTimes[:-1]) + 1 ])
+
+    isEnergy = np.array([ column in energyColumns for column in means.columns ])
+    values = means.values.astype(np.float64)
+    n = counts.values.astype(np.int64)
+
+    # Work in the energy domain for levels
+    values[:, isEnergy] = 10 ** (values[:, isEnergy] / 10)
+    weighted = np.where(n > 0, values * n, 0)
+
+    sums = np.add.reduceat(weighted, starts, axis= 0)
+    binCounts = np.add.reduceat(n, starts, axis= 0)
+    with np.errstate(divide= "ignore", invalid= "ignore"):
+        binMeans = sums / binCounts
+        binMeans[:, isEnergy] = 10 * np.log10(binMeans[:, isEnergy])
+    binMeans[binCounts == 0] = np.nan
+
+    index = pd.DatetimeIndex(bins[starts], name= means.index.name)
+    return (
+        pd.DataFrame(binMeans, index= index, columns= means.columns),
+        pd.DataFrame(binCounts.astype(np.int32), index= index, columns= means.columns)
+    )
+
+def _pack(means, counts):
+    return pd.concat([means, counts], axis= 1, keys= ["mean", "count"])
+
+def _unpack(data):
+    # Archives read columns back as a flat Index of tuples
+    data.columns = pd.MultiIndex.from_tuples(data.columns)
+    return data["mean"], data["count"]
+
+
+class Pyramid:
+    """
+    A directory of :class:`soundDENA.archive.ColumnArchive` objects, one for each level above the
+    original samples (see :data:`levels`).
+    """
+    def __init__(self, directory):
+        self.directory = pathlib.Path(directory)
+
+    @staticmethod
+    def _levelName(step):
+        return pd.Timedelta(step).isoformat()
+
+    def level(self, step):
+        """
+        The ColumnArchive of one level of the pyramid
+        """
+        return archive.ColumnArchive( self.directory / self._levelName(step) )
+
+    @property
+    def manifest(self):
+        """
+        The manifest of the top level, or None if the pyramid doesn't exist.
+        The top level is written last, so its manifest also says if the whole pyramid is complete.
+        """
+        return self.level(levels[-1]).manifest
+
+    def exists(self):
+        return self.manifest is not None
+
+    @property
+    def columns(self):
+        return pd.Index([ label for kind, label in self.manifest["columns"] if kind == "mean" ])
+
+    def build(self, chunks, energyColumns= (), info= None):
+        """
+        Build the pyramid from the original samples, replacing any existing pyramid.
+
+        Parameters
+        ----------
+        chunks : iterable of DataFrame
+            The original samples, indexed by time, in chronological order. Each chunk must cover
+            whole bins of the top level (i.e. whole hours or days), as from ``nvsplStream(..., chunk= "1d")``.
+            Only numeric columns are kept.
+        energyColumns : collection of column labels
+            Columns of levels in dB, which are averaged in the energy domain
+        info : dict, optional
+            Extra information to store in each level's manifest (i.e. what the pyramid was made from)
+        """
+        tmpDirectory = self.directory.with_name(self.directory.name + ".tmp{}".format(os.getpid()))
+        if tmpDirectory.exists():
+            shutil.rmtree(str(tmpDirectory))
+        tmpDirectory.mkdir(parents= True)
+        tmpPyramid = Pyramid(tmpDirectory)
+
+        # The first level above the samples comes straight from the samples;
+        # every level after that is built by reading back the level below it
+        below = ( fromSamples(chunk.select_dtypes(include= [np.number])) for chunk in chunks )
+        for step in levels[1:]:
+            levelChunks = ( _pack(*aggregate(means, counts, step, energyColumns)) for means, counts in below )
+            tmpPyramid.level(step).write(levelChunks, info= info)
+            below = ( _unpack(chunk) for chunk in tmpPyramid.level(step).iterChunks() )
+
+        if self.directory.exists():
+            shutil.rmtree(str(self.directory))
+        os.replace(str(tmpDirectory), str(self.directory))
+
+    def read(self, step, columns= None, start= None, end= None):
+        """
+        Read one level of the pyramid.
+
+        Parameters
+        ----------
+        step : str or Timedelta
+            Which level to read; one of :data:`levels` (except the first)
+        columns : list, optional
+            Labels of the original columns to read. Defaults to all.
+        start, end : datetime-like, optional
+            Only include bins starting in this time range (inclusive)
+
+        Returns
+        -------
+        means, counts : DataFrame
+        """
+        levelArchive = self.level(step)
+        if columns is None:
+            columns = list(self.columns)
+        data = levelArchive.read([ ("mean", column) for column in columns ] + [ ("count", column) for column in columns ], start, end)
+        if len(data) == 0:
+            index = pd.DatetimeIndex([], name= levelArchive.manifest["indexName"])
+            return pd.DataFrame(columns= columns, index= index, dtype= np.float64), pd.DataFrame(columns= columns, index= index, dtype= np.int32)
+        return _unpack(data)
@@ -0,0 +1,310 @@
+import numpy as np
+import pandas as pd
+import pathlib
+
+"""
+Mergeable histograms of sound levels, for exceedance percentiles (L90, L50, L10...) without the raw data
+
+A :class:`LevelHistograms` counts how many samples of each band fell at each level, in fixed 0.1 dB bins
+(the precision NVSPL is written with), separately for each site and each hour. Since counts just add up,
+histograms from different files, days, sites, or seasons merge exactly, and percentiles over any grouping
+of them come out the same as if they'd been computed from every sample at once.
+
+Histograms are stored sparsely: one entry of (row, bin, count) per level actually observed, where each row
+is one band of one group (site and hour).
+"""
+
+## Width of each histogram bin, in dB
+binWidth = 0.1
+
+class LevelHistograms:
+    """
+    Per-band histograms of levels, in 0.1 dB bins, for each site and hour.
+
+    Attributes
+    ----------
+    groups : DataFrame
+        One row per group of samples, with the columns "site" and "hour" (the start of the hour)
+    bands : pandas Index
+        Labels of the bands (columns of the original data) with histograms
+    row, bin, count : 1D ndarray
+        The histograms, sorted by row then bin. ``row`` is ``group number * number of bands + band number``;
+        ``bin`` is the level in tenths of a dB.
+    """
+    def __init__(self, groups, bands, row, bin, count):
+        self.groups = groups.reset_index(drop= True)
+        self.bands = pd.Index(bands)
+        self.row = row
+        self.bin = bin
+        self.count = count
+
+    @classmethod
+    def empty(cls, bands):
+        return cls(
+            pd.DataFrame({"site": np.array([], dtype= object), "hour": pd.DatetimeIndex([])}),
+            bands,
+            np.array([], dtype= np.int64), np.array([], dtype= np.int32), np.array([], dtype= np.int64)
+        )
+
+    @classmethod
+    def fromFrame(cls, data, site, bands= None, period= "1h"):
+        """
+        Count the levels in a DataFrame of samples.
+
+        Parameters
+        ----------
+        data : DataFrame
+            Levels in dB, indexed by time, i.e. from :func:`soundDENA.accessors.nvspl`. NaN levels aren't counted.
+        site : str
+            Label for the site the data is from (i.e. its :ref:`siteID`)
+        bands : list, optional
+            Which columns to count. Defaults to all of them. Bands missing from ``data`` get no counts.
+        period : str or Timedelta, default "1h"
+            Length of time to keep separate histograms for
+
+        Returns
+        -------
+        LevelHistograms
+        """
+        bands = pd.Index(bands) if bands is not None else data.columns
+        if len(data) == 0:
+            return cls.empty(bands)
+
+        hours = data.index.floor(period)
+        groupCodes, groupHours = pd.factorize(hours, sort= True)
+
+        levels = data.reindex(columns= bands).values.astype(np.float64)
+        valid = np.isfinite(levels)
+        bins = np.round(levels[valid] / binWidth).astype(np.int64)
+        rows = (groupCodes[:, np.newaxis] * len(bands) + np.arange(len(bands)))[valid]
+
+        row, bin, count = _coalesce(rows, bins, np.ones(len(rows), dtype= np.int64))
+        groups = pd.DataFrame({"site": np.full(len(groupHours), site, dtype= object), "hour": groupHours})
+        return cls(groups, bands, row, bin, count)
+
+    @classmethod
+    def fromStream(cls, chunks, site, bands= None, period= "1h"):
+        """
+        Count the levels in an iterable of DataFrames (i.e. from ``soundDENA.nvspl.stream``),
+        holding only one chunk of samples in memory at a time.
+        """
+        histograms = [ cls.fromFrame(chunk, site, bands, period) for chunk in chunks ]
+        if len(histograms) == 0:
+            return cls.empty(bands if bands is not None else [])
+        return cls.merge(*histograms)
+
+    @classmethod
+    def merge(cls, *histograms):
+        """
+        Combine histograms, adding the counts of any groups (site and hour) they have in common.
+        All must have the same bands.
+        """
+        bands = histograms[0].bands
+        for other in histograms[1:]:
+            if not other.bands.equals(bands):
+                raise ValueError("Can only merge histograms of the same bands")
+
+        allGroups = pd.concat([ h.groups for h in histograms ], ignore_index= True)
+        groupIndex = pd.MultiIndex.from_frame(allGroups)
+        codes, uniqueGroups = pd.factorize(groupIndex, sort= True)
+
+        rows = []
+        offset = 0
+        for h in histograms:
+            # Renumber each histogram's rows by the merged group numbers
+            groupNumbers = codes[offset : offset + len(h.groups)]
+            rows.append( groupNumbers[h.row // len(bands)] * len(bands) + h.row % len(bands) )
+            offset += len(h.groups)
+
+        row, bin, count = _coalesce(
+            np.concatenate(rows),
+            np.concatenate([ h.bin for h in histograms ]),
+            np.concatenate([ h.count for h in histograms ])
+        )
+        groups = pd.DataFrame({
+            "site": uniqueGroups.get_level_values(0).values.astype(object),
+            "hour": pd.DatetimeIndex(uniqueGroups.get_level_values(1))
+        })
+        return cls(groups, bands, row, bin, count)
+
+    def __add__(self, other):
+        return self.merge(self, other)
+
+    def __len__(self):
+        return len(self.groups)
+
+    def select(self, mask):
+        """
+        Keep only some groups.
+
+        Parameters
+        ----------
+        mask : boolean array-like
+            One value per row of :attr:`groups`, i.e. ``h.select(h.groups.hour.dt.hour.isin(range(7, 19)))``
+        """
+        mask = np.asarray(mask, dtype= bool)
+        newNumbers = np.cumsum(mask) - 1
+        keep = mask[self.row // len(self.bands)]
+        row = self.row[keep]
+        row = newNumbers[row // len(self.bands)] * len(self.bands) + row % len(self.bands)
+        return LevelHistograms(self.groups[mask], self.bands, row, self.bin[keep], self.count[keep])
+
+    def exceedance(self, percents= (90, 50, 10), by= None):
+        """
+        Exceedance levels: the level exceeded ``percent`` of the time (i.e. L90 for 90), for each band.
+
+        Parameters
+        ----------
+        percents : iterable of number, default (90, 50, 10)
+        by : optional
+            How to group the histograms before computing levels:
+
+            - None: all together
+            - "site", "hour", or "date": by site, by hour (the start time), or by day
+            - a dict or Series mapping sites to labels, i.e. a column of ``soundDENA.metadata``
+            - an array-like of labels, one per row of :attr:`groups`
+
+            Groups labeled NaN (i.e. sites missing from a Series) are left out.
+
+        Returns
+        -------
+        DataFrame
+            One row per label (or a single row labeled "all" if ``by`` is None), with columns for
+            each band and percent, like ``("dbA", "L90")``. Levels are the 0.1 dB bins they fall in.
+        """
+        index, row, bin, count = self._grouped(by)
+        nBands = len(self.bands)
+
+        percents = list(percents)
+        result = np.full((len(index) * nBands, len(percents)), np.nan)
+        if len(row) > 0:
+            starts = np.concatenate([ [0], np.flatnonzero(np.diff(row)) + 1 ])
+            cumulative = np.cumsum(count)
+            before = np.concatenate([ [0], cumulative[starts[1:] - 1] ])
+            totals = np.add.reduceat(count, starts)
+            # Position of each histogram in the cumulative sum, to search within one histogram at a time
+            for j, percent in enumerate(percents):
+                # The smallest level with at least (100 - percent)% of samples at or below it
+                target = before + np.ceil( totals * (100 - percent) / 100 ).clip(1, None)
+                positions = np.searchsorted(cumulative, target, side= "left")
+                result[row[starts], j] = _levels(bin[positions])
+
+        columns = pd.MultiIndex.from_product([self.bands, [ "L{:g}".format(p) for p in percents ]])
+        return pd.DataFrame(result.reshape(len(index), nBands * len(percents)), index= index, columns= columns)
+
+    def leq(self, by= None):
+        """
+        Equivalent continuous level (the energetic mean) of each band, grouped the same way as :meth:`exceedance`.
+
+        Returns
+        -------
+        DataFrame
+            One row per label, one column per band
+        """
+        index, row, bin, count = self._grouped(by)
+        energy = np.bincount(row, weights= count * 10 ** (_levels(bin) / 10), minlength= len(index) * len(self.bands))
+        n = np.bincount(row, weights= count, minlength= len(index) * len(self.bands))
+        with np.errstate(divide= "ignore", invalid= "ignore"):
+            result = 10 * np.log10(energy / n)
+        return pd.DataFrame(result.reshape(len(index), len(self.bands)), index= index, columns= self.bands)
+
+    def total(self, by= None):
+        """
+        Number of (non-NaN) samples of each band, grouped the same way as :meth:`exceedance`.
+        """
+        index, row, bin, count = self._grouped(by)
+        n = np.bincount(row, weights= count, minlength= len(index) * len(self.bands)).astype(np.int64)
+        return pd.DataFrame(n.reshape(len(index), len(self.bands)), index= index, columns= self.bands)
+
+    def _grouped(self, by):
+        """
+        Combine histograms by label. Returns the index of labels, and the combined (row, bin, count),
+        where rows are ``label number * number of bands + band number``.
+        """
+        labels = self._labels(by)
+        labelCodes, uniqueLabels = pd.factorize(labels, sort= True)
+        nBands = len(self.bands)
+
+        entryCodes = labelCodes[self.row // nBands]
+        keep = entryCodes >= 0
+        rows = (entryCodes * nBands + self.row % nBands)[keep]
+        row, bin, count = _coalesce(rows, self.bin[keep], self.count[keep])
+        index = pd.Index(uniqueLabels) if by is not None else pd.Index(["all"])
+        return index, row, bin, count
+
+    def _labels(self, by):
+        if by is None:
+            return np.zeros(len(self.groups), dtype= np.int64)
+        if isinstance(by, str):
+            if by == "site":
+                return self.groups.site.values
+            if by == "hour":
+                return self.groups.hour.values
+            if by == "date":
+                return self.groups.hour.dt.normalize().values
+            raise ValueError("Unknown grouping {!r}".format(by))
+        if isinstance(by, dict):
+            by = pd.Series(by)
+        if isinstance(by, pd.Series):
+            return self.groups.site.map(by).values
+        return np.asarray(by)
+
+    def save(self, path):
+        """
+        Save to a ``.npz`` file
+        """
+        np.savez_compressed(
+            str(path),
+            site= self.groups.site.values.astype(str),
+            hour= self.groups.hour.values.astype("datetime64[ns]").view(np.int64),
+            bands= np.asarray(self.bands, dtype= str),
+            row= self.row, bin= self.bin, count= self.count
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load histograms saved with :meth:`save`
+        """
+        with np.load(str(path)) as f:
+            groups = pd.DataFrame({
+                "site": f["site"].astype(object),
+                "hour": pd.DatetimeIndex(f["hour"].view("datetime64[ns]"))
+            })
+            return cls(groups, list(f["bands"]), f["row"], f["bin"], f["count"])
+
+    def __repr__(self):
+        return "<LevelHistograms: {} bands, {} hours from {} sites>".format(len(self.bands), len(self.groups), self.groups.site.nunique())
+
+
+def _levels(bins):
+    # Divide rather than multiply by the bin width, so levels come out exactly as parsed from the file (i.e. 40.1, not 40.100000000000001)
+    return bins / np.round(1 / binWidth)
+
+def _coalesce(row, bin, count):
+    """
+    Sort entries by (row, bin), adding the counts of duplicates
+    """
+    if len(row) == 0:
+        return row.astype(np.int64), bin.astype(np.int32), count.astype(np.int64)
+    row = row.astype(np.int64)
+    bin = bin.astype(np.int64)
+    lowest = bin.min()
+    span = bin.max() - lowest + 1
+    # One integer key per (row, bin), which sorts the same as sorting by row then bin
+    key = row * span + (bin - lowest)
+    nKeys = (row.max() + 1) * span
+
+    if nKeys <= max(4 * len(key), 2**20):
+        # Few enough possible keys to count them all directly, without sorting
+        counts = np.bincount(key, weights= count, minlength= nKeys)
+        key = np.flatnonzero(counts)
+        summed = counts[key].astype(np.int64)
+    else:
+        order = np.argsort(key, kind= "stable")
+        key, count = key[order], count[order]
+        starts = np.concatenate([ [0], np.flatnonzero(key[1:] != key[:-1]) + 1 ])
+        key = key[starts]
+        summed = np.add.reduceat(count.astype(np.int64), starts)
+
+    return key // span, (key % span + lowest).astype(np.int32), summed
@@ -0,0 +1,160 @@
+from . import sketch
+from . import cube
+
+import numpy as np
+import pandas as pd
+import collections
+
+"""
+Percent of time above sound level thresholds, for any grid of thresholds at once
+
+Rather than comparing every sample to every threshold, the levels in each group (season, band,
+and day or night) are sorted once, with a running total of how many samples are at or below each
+level. The time above any threshold is then one binary search into that running total, so a grid of
+hundreds of thresholds costs barely more than one.
+
+Input can be NVSPL samples (a DataFrame), or :class:`soundDENA.sketch.LevelHistograms`, whose
+levels are already counted; the result is the same either way.
+"""
+
+Metric = collections.namedtuple("Metric", ["data", "n"])
+
+def percentTimeAbove(data, thresholds, bands= ("dbA",), day= (7, 19), seasons= None, tableTypes= None):
+    """
+    Percent of time that levels were above each of a grid of thresholds, by season, band, and day or night.
+
+    Parameters
+    ----------
+    data : DataFrame or soundDENA.sketch.LevelHistograms
+        NVSPL levels in dB, indexed by time (i.e. from ``soundDENA.nvspl``), or histograms of them
+        (i.e. from ``soundDENA.nvsplHistograms``). Histograms are combined across all their sites;
+        use ``LevelHistograms.select`` first to pick sites.
+    thresholds : iterable of number
+        Levels in dB. Time strictly above each level is counted, as in the metrics files.
+    bands : iterable of str, default ("dbA",)
+        Which columns (or bands of the histograms) to use, i.e. ``["dbA", "dbF"]``
+    day : (int, int), default (7, 19)
+        Hours considered "Day": from the first hour up to but not including the second. Other hours are "Night".
+        With histograms, only whole hours can be used.
+    seasons : dict of {str: (datetime-like, datetime-like)}, optional
+        Name and (inclusive) date range of each season, i.e. ``{"Summer": ("2015-06-01", "2015-08-31")}``.
+        Data outside every season is ignored. By default, all data is one season called "All".
+    tableTypes : dict of {str: str}, optional
+        Names to use for each band in the result, i.e. ``{"dbA": "dBA", "dbF": "dBT"}``. Defaults to the band names.
+
+    Returns
+    -------
+    Metric
+        A named tuple of ``data`` and ``n``, in the same layout as ``soundDENA.metrics(...).percentTimeAbove``:
+        ``data`` is indexed by [season, tableType, "Day"/"Night"/"overall", threshold (i.e. "35dB")]
+        and ``n`` is a DataFrame of the length of data used, as Timedeltas, indexed by [season, tableType].
+        Unlike in the metrics files, "overall" is the percent of all the time (day and night together),
+        not the mean of the day and night percents.
+    """
+    tables, ns = percentTimeAboveTables(data, thresholds, bands, day, seasons, tableTypes)
+    data = cube.LabeledArray.fromFrames(tables, names= ["Season", "Table"])
+    n = pd.DataFrame(ns)
+    n.columns.name = "Season"
+    n.index.name = "Table"
+    return Metric(data, n)
+
+def percentTimeAboveTables(data, thresholds, bands= ("dbA",), day= (7, 19), seasons= None, tableTypes= None):
+    """
+    The tables of :func:`percentTimeAbove`, before being combined.
+
+    Returns
+    -------
+    tables : dict of { season: {tableType: DataFrame} }
+        Each DataFrame has the rows "Day", "Night", and "overall", and a column for each threshold
+    ns : dict of { season: {tableType: Timedelta} }
+    """
+    thresholds = np.asarray(list(thresholds), dtype= np.float64)
+    bands = list(bands)
+    tableTypes = tableTypes if tableTypes is not None else {}
+    seasonNames = list(seasons.keys()) if seasons is not None else ["All"]
+
+    if isinstance(data, sketch.LevelHistograms):
+        times = pd.DatetimeIndex(data.groups.hour)
+    else:
+        times = data.index
+    # Histograms count samples without their times, so both assume NVSPL's 1-second samples
+    sampleLength = pd.Timedelta(seconds= 1)
+
+    # Group number of each time: season * 2 + (0 for day, 1 for night); -1 if in no season
+    seasonCodes = _seasonCodes(times, seasons)
+    isNight = ~( (times.hour >= day[0]) & (times.hour < day[1]) )
+    timeGroups = np.where(seasonCodes >= 0, seasonCodes * 2 + isNight, -1)
+    nGroups = len(seasonNames) * 2
+
+    tables = collections.defaultdict(dict)
+    ns = collections.defaultdict(dict)
+    for band in bands:
+        if isinstance(data, sketch.LevelHistograms):
+            groups, levels, weights = _histogramLevels(data, band, timeGroups)
+        else:
+            groups, levels, weights = _sampleLevels(data[band].values, timeGroups)
+
+        # Sort levels within each group, and count how many are at or below each one
+        order = np.lexsort((levels, groups))
+        groups, levels, cumulative = groups[order], levels[order], np.cumsum(weights[order])
+        bounds = np.searchsorted(groups, np.arange(nGroups + 1), side= "left")
+
+        above = np.zeros((nGroups, len(thresholds)))
+        totals = np.zeros(nGroups)
+        for group in range(nGroups):
+            lo, hi = bounds[group], bounds[group + 1]
+            if hi == lo:
+                continue
+            base = cumulative[lo - 1] if lo > 0 else 0
+            totals[group] = cumulative[hi - 1] - base
+            # Number of levels at or below each threshold, in one search for the whole grid
+            atOrBelow = np.searchsorted(levels[lo:hi], thresholds, side= "right")
+            countBelow = np.where(atOrBelow > 0, cumulative[lo + atOrBelow - 1] - base, 0)
+            above[group] = totals[group] - countBelow
+
+        tableType = tableTypes.get(band, band)
+        for s, season in enumerate(seasonNames):
+            dayAbove, nightAbove = above[2*s], above[2*s + 1]
+            dayTotal, nightTotal = totals[2*s], totals[2*s + 1]
+            with np.errstate(divide= "ignore", invalid= "ignore"):
+                table = pd.DataFrame(
+                    [ 100 * dayAbove / dayTotal, 100 * nightAbove / nightTotal, 100 * (dayAbove + nightAbove) / (dayTotal + nightTotal) ],
+                    index= ["Day", "Night", "overall"],
+                    columns= [ "{:g}dB".format(threshold) for threshold in thresholds ]
+                )
+            tables[season][tableType] = table
+            ns[season][tableType] = (dayTotal + nightTotal) * sampleLength
+
+    return { season: dict(types) for season, types in tables.items() }, { season: dict(types) for season, types in ns.items() }
+
+def _seasonCodes(times, seasons):
+    """
+    The number of the season each time falls in, or -1 for none
+    """
+    if seasons is None:
+        return np.zeros(len(times), dtype= np.int64)
+    codes = np.full(len(times), -1, dtype= np.int64)
+    dates = times.normalize()
+    for s, (start, end) in enumerate(seasons.values()):
+        inSeason = (dates >= pd.Timestamp(start).normalize()) & (dates <= pd.Timestamp(end).normalize())
+        codes[ inSeason & (codes < 0) ] = s
+    return codes
+
+def _sampleLevels(values, timeGroups):
+    """
+    (group, level, weight) of each valid sample
+    """
+    valid = np.isfinite(values) & (timeGroups >= 0)
+    return timeGroups[valid], values[valid].astype(np.float64), np.ones(valid.sum(), dtype= np.int64)
+
+def _histogramLevels(histograms, band, timeGroups):
+    """
+    (group, level, weight) of each histogram bin of a band
+    """
+    nBands = len(histograms.bands)
+    bandNumber = histograms.bands.get_loc(band)
+    inBand = (histograms.row % nBands) == bandNumber
+    groups = timeGroups[ histograms.row[inBand] // nBands ]
+    keep = groups >= 0
+    levels = sketch._levels(histograms.bin[inBand][keep])
+    return groups[keep], levels, histograms.count[inBand][keep]